@@ -1,106 +1,273 @@
-from datetime import datetime
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Any
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from modules.datalake_writer import DataLakeWriter
 from modules.custom_logger import LoggingManager
 
-def fill_user_table(user_access: List, object_type: str, object_id: str, list_of_users: List[Dict]) -> None:
-    """Add user access rights to the user_access list"""
-    for user in list_of_users:
-        access_right = user.get([x for x in user if 'UserAccessRight' in x][0])
-        user_access.append([user['graphId'], object_id, access_right, object_type])
-
-def fill_dimension_table(
-    workspace_content: List, 
-    users: List, 
-    all_data: Dict, 
-    workspace_id: str, 
-    object_type: str, 
-    object_data: Dict
-) -> None:
-    """Process dimension table data and user access rights"""
-    try:
-        element_id = object_data['id']
-    except:
-        element_id = object_data['objectId']
-        
-    fill_user_table(users, object_type, element_id, object_data.get('users', []))
+USER_ACCESS_COLUMNS = ['userID', 'objectID', 'accessType', 'objectType']
+WORKSPACE_CONTENT_COLUMNS = ['workspaceID', 'objectID', 'objectType']
+MAX_CONCURRENT_WRITES = 8
+# Workspaces per process pool task, large enough to amortize pickling the results
+WORKSPACE_CHUNK_SIZE = 500
+# Upper bound of the process pool, the Functions host may report more CPUs than the worker can use
+MAX_PROCESS_WORKERS = 4
 
-    dimension_data = {key:value for key,value in object_data.items() if isinstance(value, str)}
-    try:
-        all_data[object_type].append(dimension_data)
-    except:
-        all_data[object_type] = [dimension_data]
-
-    workspace_content.append([workspace_id, element_id, object_type])
-
-def process_workspace_users(user_access: List, users: List, workspace: Dict) -> None:
-    """Process users in a workspace"""
-    workspace_id = workspace['id']
-    for user in workspace['users']:
-        users.append({
-            'graphId': user['graphId'],
-            'emailAddress': user.get('emailAddress', ''),
-            'displayName': user.get('displayName', '')
-        })
-        access_right = user.get([x for x in user if 'UserAccessRight' in x][0])
-        user_access.append([user['graphId'], workspace_id, access_right, 'workspace'])
-
-def process_workspace_objects(workspace_content: List, users: List, all_data: Dict, workspace: Dict) -> None:
-    """Process objects (reports, dashboards, etc) in a workspace"""
-    workspace_id = workspace['id']
-    for key, value in workspace.items():
-        if not isinstance(value, list) or key == 'users':
+# Access right key the scanner API uses for the users of each object type
+ACCESS_RIGHT_KEY = {
+    'workspace': 'groupUserAccessRight',
+    'report': 'reportUserAccessRight',
+    'dataset': 'datasetUserAccessRight',
+    'dashboard': 'dashboardUserAccessRight',
+    'dataflow': 'dataflowUserAccessRight',
+    'datamart': 'datamartUserAccessRight'
+}
+
+# Singular object type of each scanner list key
+OBJECT_TYPE_MAP = {
+    'reports': 'report',
+    'dashboards': 'dashboard',
+    'datasets': 'dataset',
+    'dataflows': 'dataflow',
+    'datamarts': 'datamart'
+}
+
+# Output schemas of the fixed silver tables, so arrow does not have to infer types
+SCHEMAS = {
+    'users': pa.schema([
+        ('graphId', pa.string()),
+        ('emailAddress', pa.string()),
+        ('displayName', pa.string())
+    ]),
+    'user_access': pa.schema([(column, pa.string()) for column in USER_ACCESS_COLUMNS]),
+    'workspace_content': pa.schema([(column, pa.string()) for column in WORKSPACE_CONTENT_COLUMNS])
+}
+
+def normalize_records(workspace_content: List[Dict], key: str) -> pd.DataFrame:
+    """Flatten the `key` list of every workspace into one frame tagged with the workspace id"""
+    workspaces = [workspace for workspace in workspace_content if workspace.get(key)]
+    if not workspaces:
+        return pd.DataFrame()
+    return pd.json_normalize(workspaces, record_path=[key], meta=['id'], meta_prefix='workspace_', max_level=0)
+
+def object_type_of(key: str) -> str:
+    """Singular object type of a scanner list key"""
+    if key in OBJECT_TYPE_MAP:
+        return OBJECT_TYPE_MAP[key]
+    return key[:-1] if key.endswith('s') else key
+
+def access_rights(users: pd.DataFrame, object_type: str) -> pd.Series:
+    """Pick the *UserAccessRight value of each user row"""
+    key = ACCESS_RIGHT_KEY.get(object_type)
+    if key in users:
+        return users[key]
+
+    # Unknown object type or key name, fall back to scanning the columns
+    rights = users.filter(like='UserAccessRight')
+    if rights.empty:
+        return pd.Series(None, index=users.index, dtype=object)
+    return rights.bfill(axis=1).iloc[:, 0]
+
+def empty_columns(names: List[str]) -> Dict[str, np.ndarray]:
+    """Column arrays without rows"""
+    return {name: np.array([], dtype=object) for name in names}
+
+def concat_columns(blocks: List[Dict[str, np.ndarray]], names: List[str]) -> Dict[str, np.ndarray]:
+    """Concatenate blocks of column arrays into one array per column"""
+    if not blocks:
+        return empty_columns(names)
+    if len(blocks) == 1:
+        return blocks[0]
+    # np.concatenate sizes each output array once from the block lengths
+    return {name: np.concatenate([block[name] for block in blocks]) for name in names}
+
+def build_user_access(users: pd.DataFrame, object_ids: Any, object_type: str) -> Dict[str, np.ndarray]:
+    """Build user access columns for a frame of users"""
+    return {
+        'userID': users['graphId'].to_numpy(dtype=object),
+        'objectID': np.asarray(object_ids, dtype=object),
+        'accessType': access_rights(users, object_type).to_numpy(dtype=object),
+        'objectType': np.full(len(users), object_type, dtype=object)
+    }
+
+def process_workspace_users(workspace_content: List[Dict]) -> Dict[str, Any]:
+    """Process users of all workspaces"""
+    users = normalize_records(workspace_content, 'users')
+    if users.empty:
+        return {'users': pd.DataFrame(), 'user_access': empty_columns(USER_ACCESS_COLUMNS)}
+
+    return {
+        'users': users.reindex(columns=['graphId', 'emailAddress', 'displayName']).fillna(''),
+        'user_access': build_user_access(users, users['workspace_id'].to_numpy(), 'workspace')
+    }
+
+def process_workspace_objects(workspace_content: List[Dict], key: str, object_type: str) -> Dict[str, Any]:
+    """Process objects (reports, dashboards, etc) of one kind in all workspaces"""
+    objects = normalize_records(workspace_content, key)
+    if objects.empty:
+        return {}
+
+    element_ids = objects['id'] if 'id' in objects else objects['objectId']
+    if 'id' in objects and 'objectId' in objects:
+        element_ids = element_ids.fillna(objects['objectId'])
+
+    user_access = empty_columns(USER_ACCESS_COLUMNS)
+    if 'users' in objects:
+        object_users = objects['users'].explode().dropna()
+        if not object_users.empty:
+            users = pd.json_normalize(object_users.tolist(), max_level=0)
+            user_access = build_user_access(users, element_ids.loc[object_users.index].to_numpy(), object_type)
+
+    dimension_columns = [
+        column for column in objects.columns
+        if column != 'workspace_id' and pd.api.types.infer_dtype(objects[column], skipna=True) == 'string'
+    ]
+
+    return {
+        'dimension': objects[dimension_columns],
+        'user_access': user_access,
+        'workspace_content': {
+            'workspaceID': objects['workspace_id'].to_numpy(dtype=object),
+            'objectID': element_ids.to_numpy(dtype=object),
+            'objectType': np.full(len(objects), object_type, dtype=object)
+        }
+    }
+
+def concat_frames(frames: List[pd.DataFrame], columns: List[str] = None) -> pd.DataFrame:
+    """Concatenate the non-empty frames"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def process_workspace_chunk(workspaces: List[Dict]) -> Dict[str, Any]:
+    """Process users and objects of a chunk of workspaces, runs in a worker process"""
+    workspace_data = process_workspace_users(workspaces)
+    user_access = [workspace_data['user_access']]
+    workspace_content = []
+    all_data = {}
+
+    # One frame per list key
+    object_keys = {
+        key for workspace in workspaces
+        for key, value in workspace.items() if isinstance(value, list) and key != 'users'
+    }
+    for key in sorted(object_keys):
+        object_type = object_type_of(key)
+        object_data = process_workspace_objects(workspaces, key, object_type)
+        if not object_data:
             continue
-        for object_data in value:
-            object_type = key.rstrip('s')  # Remove trailing 's' to get singular form
-            fill_dimension_table(workspace_content, users, all_data, workspace_id, object_type, object_data)
+        user_access.append(object_data['user_access'])
+        workspace_content.append(object_data['workspace_content'])
+        all_data[object_type] = object_data['dimension']
+
+    return {
+        'users': workspace_data['users'],
+        'user_access': concat_columns(user_access, USER_ACCESS_COLUMNS),
+        'workspace_content': concat_columns(workspace_content, WORKSPACE_CONTENT_COLUMNS),
+        'all_data': all_data
+    }
+
+@lru_cache(maxsize=1)
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all transforms of the worker"""
+    # Spawn instead of fork, forking the threaded Functions worker can deadlock the children
+    return ProcessPoolExecutor(
+        max_workers=min(MAX_PROCESS_WORKERS, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+async def process_workspace_content(workspace_content: List[Dict]) -> Dict[str, Any]:
+    """Process all workspaces, in chunks on the process pool for larger tenants"""
+    chunks = [
+        workspace_content[i:i + WORKSPACE_CHUNK_SIZE]
+        for i in range(0, len(workspace_content), WORKSPACE_CHUNK_SIZE)
+    ]
+    if len(chunks) <= 1:
+        return process_workspace_chunk(workspace_content)
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(get_process_pool(), process_workspace_chunk, chunk)
+        for chunk in chunks
+    ])
+
+    object_types = sorted({object_type for result in results for object_type in result['all_data']})
+    return {
+        'users': concat_frames([result['users'] for result in results]),
+        'user_access': concat_columns([result['user_access'] for result in results], USER_ACCESS_COLUMNS),
+        'workspace_content': concat_columns([result['workspace_content'] for result in results], WORKSPACE_CONTENT_COLUMNS),
+        'all_data': {
+            object_type: concat_frames([result['all_data'][object_type] for result in results if object_type in result['all_data']])
+            for object_type in object_types
+        }
+    }
 
-async def transform_powerbi_data(client: str, writer: DataLakeWriter, logger: LoggingManager) -> None:
-    """Transform Power BI data from bronze to silver layer"""
+def to_arrow(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Table:
+    """Convert a DataFrame to an arrow table"""
+    if schema is not None and df.empty:
+        return schema.empty_table()
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False, nthreads=os.cpu_count())
+
+def columns_to_arrow(columns: Dict[str, np.ndarray], schema: pa.Schema) -> pa.Table:
+    """Build an arrow table straight from column arrays, treating NaN as null"""
+    return pa.table(
+        {name: pa.array(columns[name], type=schema.field(name).type, from_pandas=True) for name in schema.names},
+        schema=schema
+    )
+
+def deduplicate(table: pa.Table, keys: List[str]) -> pa.Table:
+    """Keep the first row per key using arrow's hash grouping instead of pandas object hashing"""
+    keys = [key for key in keys if key in table.column_names]
+    if table.num_rows == 0 or not keys:
+        return table
+
+    # Group only the key columns plus a row number, then take the first row of every group
+    rows = table.select(keys).append_column('row', pa.array(np.arange(table.num_rows)))
+    first_rows = rows.group_by(keys).aggregate([('row', 'min')])['row_min']
+    return table.take(first_rows.sort())
+
+async def transform_powerbi_data(client: str, writer: DataLakeWriter, logger: LoggingManager, today: str) -> None:
+    """Transform Power BI data from bronze to silver layer for the date formatted as '%d%m%Y'"""
     try:
-        today = datetime.now().strftime('%d%m%Y')
         silver_path = f'{today}/{client}'
 
         # Read input data
         input_data = {
-            'workspaces': pd.DataFrame(writer.read_json_data('test-app', f'{client}_workspaces_{today}')),
-            'activities': pd.DataFrame(writer.read_json_data('test-app', f'{client}_activities_{today}')),
+            'workspaces': writer.read_arrow_table('test-app', f'workspaces_{today}', filters=[('client', '=', client)]).drop_columns(['client']),
+            'activities': writer.read_arrow_json('test-app', f'{client}_activities_{today}'),
             'workspace_content': writer.read_json_data('bronze', f'{client}_workspace_content_{today}')
         }
 
         # Process workspace content
-        user_access = []
-        users = []
-        workspace_content = []
-        all_data = {}
-
-        # Process each workspace
-        for workspace in input_data['workspace_content']:
-            for key, value in workspace.items():
-                if not isinstance(value, list):
-                    continue
-                if key == "users":
-                    process_workspace_users(user_access, users, workspace)
-                else:
-                    process_workspace_objects(workspace_content, users, all_data, workspace)
-
-        # Create and deduplicate dataframes
+        content_data = await process_workspace_content(input_data['workspace_content'])
+
+        # Create and deduplicate arrow tables
         output_data = {
-            'users': pd.DataFrame(users).drop_duplicates(),
-            'user_access': pd.DataFrame(user_access).drop_duplicates(),
+            'users': deduplicate(to_arrow(content_data['users'], SCHEMAS['users']), ['graphId']),
+            'user_access': deduplicate(columns_to_arrow(content_data['user_access'], SCHEMAS['user_access']), ['userID', 'objectID', 'objectType']),
             'workspaces': input_data['workspaces'],
-            'workspace_content': pd.DataFrame(workspace_content),
+            'workspace_content': columns_to_arrow(content_data['workspace_content'], SCHEMAS['workspace_content']),
             'activities': input_data['activities'],
-            **{key: pd.DataFrame(value).drop_duplicates() for key, value in all_data.items()}
+            **{key: deduplicate(to_arrow(value), ['id'] if 'id' in value else ['objectId']) for key, value in content_data['all_data'].items()}
         }
 
-        # Write all dataframes to silver layer
-        for name, df in output_data.items():
-            writer.write_parquet_data(df, 'silver', f'{silver_path}/{name}')
-            
+        # Write all tables to silver layer concurrently, bounded to avoid storage throttling
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_WRITES)
+
+        async def write_table(name: str, table: pa.Table) -> None:
+            async with semaphore:
+                await asyncio.to_thread(writer.write_arrow_table, table, 'silver', f'{silver_path}/{name}')
+
+        await asyncio.gather(*[write_table(name, table) for name, table in output_data.items()])
+
         logger.write_log(client, 'powerbi', 'INFO', f'Successfully transformed PowerBI data')
-            
+
     except Exception as e:
         logger.write_log(client, 'powerbi', 'ERROR', f'Failed to transform PowerBI data: {str(e)}')
-        raise
\ No newline at end of file
+        raise
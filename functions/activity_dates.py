@@ -3,7 +3,7 @@ from typing import List
 
 def get_todo_dates(client, datalake_writer) -> List[datetime]:
     """Returns dates that need activity data collected"""
-    existing_files = datalake_writer.list_files('test')
+    existing_files = set(datalake_writer.list_files('test', recursive=False))
     todo = []
     today = datetime.now()
     for i in range(29):
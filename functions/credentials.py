@@ -1,32 +1,53 @@
-import os 
+import os
+import time
+from functools import lru_cache
+from typing import Tuple
 from dotenv import load_dotenv
 
 from azure.identity import ClientSecretCredential
 from azure.keyvault.secrets import SecretClient
 from modules.datalake_writer import DataLakeWriter
 from modules.custom_logger import LoggingManager
-import os
 
+# Secrets are re-fetched from Key Vault once they are older than this
+SECRET_TTL_SECONDS = 3600
 
-def get_credentials() -> tuple[SecretClient, DataLakeWriter, LoggingManager]:
-    """Initialize shared credentials and clients"""
-    load_dotenv()
+load_dotenv()
+
+# Cached (connection string, expiry) shared by warm invocations of the worker
+_connection_string: Tuple[str, float] = ('', 0.0)
 
+
+@lru_cache(maxsize=1)
+def get_secret_client() -> SecretClient:
+    """Create the Key Vault client once per worker process"""
     # Get credentials from environment variables
     tenant_id = os.getenv('TENANT_ID')
-    client_id = os.getenv('CLIENT_ID') 
+    client_id = os.getenv('CLIENT_ID')
     client_secret = os.getenv('CLIENT_SECRET')
     credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-    
+
     # Initialize the SecretClient
     key_vault_url = os.getenv('KEYVAULT_URL')
-    secret_client = SecretClient(vault_url=key_vault_url, credential=credential)
-    
-    # Initialize DataLake writer
-    connection_string = secret_client.get_secret("adls2-connection-string").value
-    logger = LoggingManager()
-    datalake_writer = DataLakeWriter(connection_string, logger)
-    
-    return secret_client, datalake_writer, logger
+    return SecretClient(vault_url=key_vault_url, credential=credential)
 
 
+def get_connection_string(secret_client: SecretClient) -> str:
+    """Return the datalake connection string, fetching it again after SECRET_TTL_SECONDS"""
+    global _connection_string
+    connection_string, expires = _connection_string
+    if time.monotonic() >= expires:
+        connection_string = secret_client.get_secret("adls2-connection-string").value
+        _connection_string = (connection_string, time.monotonic() + SECRET_TTL_SECONDS)
+    return connection_string
+
+
+def get_credentials() -> tuple[SecretClient, DataLakeWriter, LoggingManager]:
+    """Initialize shared credentials and clients"""
+    secret_client = get_secret_client()
+
+    # Logs are collected per invocation, so the logger and writer are always new
+    logger = LoggingManager()
+    datalake_writer = DataLakeWriter(get_connection_string(secret_client), logger)
+
+    return secret_client, datalake_writer, logger
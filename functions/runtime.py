@@ -0,0 +1,15 @@
+import asyncio
+from typing import Any, Coroutine
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop does not support Windows, local development falls back to asyncio
+    uvloop = None
+
+
+def run(coroutine: Coroutine) -> Any:
+    """Run a coroutine on a new event loop, backed by uvloop when it is installed"""
+    if uvloop is not None:
+        return uvloop.run(coroutine)
+    return asyncio.run(coroutine)
@@ -2,7 +2,16 @@ from modules.datalake_writer import DataLakeWriter
 from datetime import datetime 
 
 def save_logs(datalake_writer: "DataLakeWriter", process_name: str) -> None:
-    """Save logs from the logger instance to datalake"""
+    """Queue the logs of the logger instance for writing to datalake"""
     current_date = datetime.now().strftime("%d%m%Y")
     file_name = f"logging/{current_date}/{process_name}.json"
-    datalake_writer.write_json_data(datalake_writer.logger.logging_rows, "test-app", file_name)
\ No newline at end of file
+    datalake_writer.enqueue_write(list(datalake_writer.logger.logging_rows), "test-app", file_name)
+
+
+async def flush_with_logs(datalake_writer: "DataLakeWriter", process_name: str) -> None:
+    """Write the queued data, then save and write the logs, so they include the errors of the data writes"""
+    try:
+        await datalake_writer.flush()
+    finally:
+        save_logs(datalake_writer, process_name)
+        await datalake_writer.flush()
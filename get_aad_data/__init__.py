@@ -1,26 +1,28 @@
 import logging
 import azure.functions as func
 import asyncio
+from datetime import datetime
 from functions.credentials import get_credentials
 from functions.clients import initialize_clients
 from .aad_data import process_aad_data
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
 
 async def main(aadData: func.TimerRequest) -> None:
     try:
         secret_client, datalake_writer, logger = get_credentials()
         clients = initialize_clients()['aad']
+        current_date = datetime.now().strftime("%d%m%Y")
         
         # Execute all client tasks concurrently
         await asyncio.gather(*[
-            process_aad_data(client, secret_client, datalake_writer, logger)
+            process_aad_data(client, secret_client, datalake_writer, logger, current_date)
             for client in clients
         ])
-        
-        save_logs(datalake_writer, "aad_data")
             
     except Exception as e:
         logging.error(f'Error in AAD data extraction: {str(e)}')
         if 'datalake_writer' in locals():
             datalake_writer.logger.write_log('system', 'AAD Data', 'ERROR', str(e))
-            save_logs(datalake_writer, "aad_data")
\ No newline at end of file
+    finally:
+        if 'datalake_writer' in locals():
+            await flush_with_logs(datalake_writer, "aad_data")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from datetime import datetime
+import asyncio
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -7,26 +7,20 @@ if TYPE_CHECKING:
     from modules.datalake_writer import DataLakeWriter
 
 async def process_aad_data(client: str, secret_client: "SecretClient", 
-                          datalake_writer: "DataLakeWriter", logger: "LoggingManager") -> None:
-    """Process AAD data for a client"""
+                          datalake_writer: "DataLakeWriter", logger: "LoggingManager", current_date: str) -> None:
+    """Process AAD data for a client, current_date is formatted as '%d%m%Y'"""
     from modules.graph_api import GraphAPI
     
     api = GraphAPI(client, secret_client, logger)
-    users = api.list_all_users()
+    users = await asyncio.to_thread(api.list_all_users)
     
-    licensing = []
-    for user in users:
-        try:
-            license_info = await api.get_users_licenses(user['id'])
-            if license_info:
-                licensing.append({
-                    'userId': user['id'],
-                    'licenses': license_info
-                })
-        except Exception as e:
-            logger.write_log(client, 'aad', 'ERROR', f'Failed to get licenses for user {user["id"]}: {str(e)}')
+    licenses = await asyncio.to_thread(api.get_licenses_bulk, [user['id'] for user in users])
 
-    current_date = datetime.now().strftime("%d%m%Y")
-    datalake_writer.write_json_data(users, "test-app", f"{client}_users_{current_date}")
-    datalake_writer.write_json_data(licensing, "test-app", f"{client}_licensing_{current_date}")
+    licensing = [
+        {'userId': user_id, 'licenses': license_info}
+        for user_id, license_info in licenses.items() if license_info
+    ]
+
+    datalake_writer.enqueue_write(users, "test-app", f"{client}_users_{current_date}")
+    datalake_writer.enqueue_write(licensing, "test-app", f"{client}_licensing_{current_date}")
     logger.write_log(client, 'aad', 'INFO', f'Processed {len(users)} users and {len(licensing)} licenses') 
\ No newline at end of file
@@ -4,13 +4,15 @@ import azure.functions as func
 
 import asyncio
 
+from datetime import datetime
+
 from functions.credentials import get_credentials
 
 from functions.clients import initialize_clients
 
 from .azure_data import process_azure_data
 
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
 
 
 
@@ -22,13 +24,21 @@ async def main(azureData: func.TimerRequest) -> None:
 
         clients = initialize_clients()['azure']
 
+        current_date = datetime.now().strftime("%d%m%Y")
+
+        
+
+        # List the Key Vault secrets once for all clients, the listing pages through the whole vault
+
+        secret_names = await asyncio.to_thread(lambda: [x.name for x in secret_client.list_properties_of_secrets()])
+
         
 
         # Execute all client tasks concurrently
 
         await asyncio.gather(*[
 
-            process_azure_data(client, secret_client, datalake_writer, logger)
+            process_azure_data(client, secret_client, datalake_writer, logger, current_date, secret_names)
 
             for client in clients
 
@@ -36,10 +46,6 @@ async def main(azureData: func.TimerRequest) -> None:
 
         
 
-        save_logs(datalake_writer, "azure_data")
-
-            
-
     except Exception as e:
 
         logging.error(f'Error in Azure data extraction: {str(e)}')
@@ -48,4 +54,8 @@ async def main(azureData: func.TimerRequest) -> None:
 
             datalake_writer.logger.write_log('system', 'Azure Data', 'ERROR', str(e))
 
-            save_logs(datalake_writer, "azure_data")
+    finally:
+
+        if 'datalake_writer' in locals():
+
+            await flush_with_logs(datalake_writer, "azure_data")
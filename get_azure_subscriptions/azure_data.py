@@ -1,6 +1,5 @@
-from datetime import datetime
 import asyncio
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 if TYPE_CHECKING:
     from azure.keyvault.secrets import SecretClient
@@ -8,30 +7,34 @@ if TYPE_CHECKING:
     from modules.datalake_writer import DataLakeWriter
 
 async def process_azure_data(client: str, secret_client: "SecretClient", 
-                           datalake_writer: "DataLakeWriter", logger: "LoggingManager") -> None:
-    """Process Azure data for a client"""
+                           datalake_writer: "DataLakeWriter", logger: "LoggingManager", current_date: str,
+                           secret_names: List[str]) -> None:
+    """Process Azure data for a client, current_date is formatted as '%d%m%Y' and secret_names lists the Key Vault"""
     from modules.azure_api import AzureRestAPI
     
     api = AzureRestAPI(client, secret_client, logger)
-    subscriptions = [
-        x.name for x in secret_client.list_properties_of_secrets() 
-        if client in x.name and "sub" in x.name
-    ]
+    subscriptions = [name for name in secret_names if client in name and "sub" in name]
     
+    # Resolve all subscription ids up front, the Key Vault client is synchronous
+    def get_secret_value(name: str) -> str:
+        return secret_client.get_secret(name).value
 
-    async def get_azure_costs(subscription: str):
-        id_ = secret_client.get_secret(subscription).value
+    subscription_ids = await asyncio.gather(*[asyncio.to_thread(get_secret_value, sub) for sub in subscriptions])
 
-        historical = [x for x in datalake_writer.list_files('test-app') if 'historical' in x and id_ in x]
-        if not historical:
-            costs = api.get_subscription_costs(id_, "Last365Days")
-            datalake_writer.write_json_data(costs, 'test-app', f"{id_}_historical_costs")
+    # Subscription ids that already have historical costs, listed once for all subscriptions
+    historical_ids = {name.split('_')[0] for name in datalake_writer.list_files('test-app', recursive=False) if 'historical' in name}
+
+    async def get_azure_costs(id_: str):
+        if id_ not in historical_ids:
+            # The full year is only queried once, afterwards only recent days are fetched
+            costs = await asyncio.to_thread(api.get_subscription_costs, id_, "Last365Days")
+            datalake_writer.enqueue_write(costs, 'test-app', f"{id_}_historical_costs")
         
         else:
-            current_date = datetime.now().strftime("%d%m%Y")
-            datalake_writer.write_json_data(costs, "test-app", f"{id_}_costs_{current_date}")
+            costs = await asyncio.to_thread(api.get_subscription_costs, id_, "Last7Days")
+            datalake_writer.enqueue_write(costs, "test-app", f"{id_}_costs_{current_date}")
         return costs
 
-    tasks = [get_azure_costs(sub) for sub in subscriptions]
+    tasks = [get_azure_costs(id_) for id_ in subscription_ids]
     await asyncio.gather(*tasks)
     logger.write_log(client, 'azure', 'INFO', f'Processed costs for {len(subscriptions)} subscriptions') 
\ No newline at end of file
@@ -10,7 +10,7 @@ from functions.clients import initialize_clients
 
 from .activities import process_powerbi_activities
 
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
 
 
 
@@ -34,11 +34,7 @@ async def main(powerbiActivities: func.TimerRequest) -> None:
 
         ])
 
-            
-
-        save_logs(datalake_writer, "powerbi_activities")
-
-            
+        
 
     except Exception as e:
 
@@ -48,6 +44,8 @@ async def main(powerbiActivities: func.TimerRequest) -> None:
 
             datalake_writer.logger.write_log('system', 'PowerBI Activities', 'ERROR', str(e))
 
-            save_logs(datalake_writer, "powerbi_activities")
+    finally:
+
+        if 'datalake_writer' in locals():
 
-            
+            await flush_with_logs(datalake_writer, "powerbi_activities")
@@ -12,9 +12,10 @@ if TYPE_CHECKING:
 async def process_powerbi_activity(api: "PowerBIRestAPI", date: datetime, 
                                  client: str, datalake_writer: "DataLakeWriter") -> None:
     """Process activities for a single date"""
-    activities = api.get_tenant_activities(date)
+    activities = await asyncio.to_thread(api.get_tenant_activities, date)
     file_date = date.strftime("%d%m%Y")
-    datalake_writer.write_json_data(activities, "test-app", f"{client}_activities_{file_date}")
+    # Written as soon as it is fetched, rather than holding every date's activities until the flush
+    await asyncio.to_thread(datalake_writer.write_json_data, activities, "test-app", f"{client}_activities_{file_date}")
 
 async def process_powerbi_activities(client: str, secret_client: "SecretClient", 
                                    datalake_writer: "DataLakeWriter", logger: "LoggingManager") -> None:
@@ -22,7 +23,7 @@ async def process_powerbi_activities(client: str, secret_client: "SecretClient",
     from modules.powerbi_api import PowerBIRestAPI
     
     api = PowerBIRestAPI(client, secret_client, logger)
-    dates = get_todo_dates(client, datalake_writer)
+    dates = await asyncio.to_thread(get_todo_dates, client, datalake_writer)
     activity_tasks = [
         process_powerbi_activity(api, date, client, datalake_writer) 
         for date in dates
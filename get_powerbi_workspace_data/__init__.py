@@ -10,7 +10,7 @@ from functions.clients import initialize_clients
 
 from .content import process_powerbi_content
 
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
 
 
 
@@ -34,11 +34,7 @@ async def main(powerbiContent: func.TimerRequest) -> None:
 
         ])
 
-            
-
-        save_logs(datalake_writer, "powerbi_content")
-
-            
+        
 
     except Exception as e:
 
@@ -48,4 +44,8 @@ async def main(powerbiContent: func.TimerRequest) -> None:
 
             datalake_writer.logger.write_log('system', 'PowerBI Content', 'ERROR', str(e))
 
-            save_logs(datalake_writer, "powerbi_content")
+    finally:
+
+        if 'datalake_writer' in locals():
+
+            await flush_with_logs(datalake_writer, "powerbi_content")
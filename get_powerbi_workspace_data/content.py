@@ -1,5 +1,6 @@
 from datetime import datetime
 import asyncio
+from itertools import chain
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -13,18 +14,16 @@ async def process_powerbi_content(client: str, secret_client: "SecretClient",
     from modules.powerbi_api import PowerBIRestAPI
     
     api = PowerBIRestAPI(client, secret_client, logger)
-    workspaces = api.get_workspaces()
+    workspaces = await asyncio.to_thread(api.get_workspaces)
     workspace_ids = [x['id'] for x in workspaces]
-    scans = api.post_workspace_scan(workspace_ids)
+    scans = await asyncio.to_thread(api.post_workspace_scan, workspace_ids)
     
-    # Wait for scan completion
-    await asyncio.sleep(90)
-    
-    scan_result = api.get_workspace_scans(scans)
-    workspace_content = scan_result['workspaces']
-    datasources = scan_result['datasourceInstances']
+    # Waits for each scan to complete before fetching its result
+    scan_results = await asyncio.to_thread(api.get_workspace_scans, scans)
+    workspace_content = list(chain.from_iterable(result.get('workspaces', []) for result in scan_results))
+    datasources = list(chain.from_iterable(result.get('datasourceInstances', []) for result in scan_results))
 
     current_date = datetime.now().strftime("%d%m%Y")
-    datalake_writer.write_json_data(workspace_content, "test-app", f"{client}_workspace_content_{current_date}")
-    datalake_writer.write_json_data(datasources, 'test-app', f"{client}_datasources_{current_date}"
+    datalake_writer.enqueue_write(workspace_content, "test-app", f"{client}_workspace_content_{current_date}")
+    datalake_writer.enqueue_write(datasources, 'test-app', f"{client}_datasources_{current_date}")
     logger.write_log(client, 'powerbi', 'INFO', f'Processed content for {len(workspaces)} workspaces') 
\ No newline at end of file
@@ -1,10 +1,11 @@
 import logging
 import azure.functions as func
 import asyncio
+from datetime import datetime
 from functions.credentials import get_credentials
 from functions.clients import initialize_clients
 from .workspaces import process_powerbi_workspaces
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
 
 async def main(powerbiWorkspaces: func.TimerRequest) -> None:
     try:
@@ -12,15 +13,26 @@ async def main(powerbiWorkspaces: func.TimerRequest) -> None:
         clients = initialize_clients()['powerbi']
         
         # Execute all client tasks concurrently
-        await asyncio.gather(*[
-            process_powerbi_workspaces(client, secret_client, datalake_writer, logger)
+        results = await asyncio.gather(*[
+            process_powerbi_workspaces(client, secret_client, logger)
             for client in clients
-        ])
-        
-        save_logs(datalake_writer, "powerbi_workspaces")
+        ], return_exceptions=True)
+
+        workspaces = {}
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.write_log(client, 'powerbi', 'ERROR', f'Failed to process workspaces: {str(result)}')
+            else:
+                workspaces[client] = result
+
+        # One manifest for all clients instead of a file per client
+        current_date = datetime.now().strftime("%d%m%Y")
+        await asyncio.to_thread(datalake_writer.write_workspaces_manifest, workspaces, "test-app", f"workspaces_{current_date}")
             
     except Exception as e:
         logging.error(f'Error in PowerBI workspaces extraction: {str(e)}')
         if 'datalake_writer' in locals():
             datalake_writer.logger.write_log('system', 'PowerBI Workspaces', 'ERROR', str(e))
-            save_logs(datalake_writer, "powerbi_workspaces")
\ No newline at end of file
+    finally:
+        if 'datalake_writer' in locals():
+            await flush_with_logs(datalake_writer, "powerbi_workspaces")
\ No newline at end of file
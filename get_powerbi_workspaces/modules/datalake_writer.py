@@ -1,4 +1,5 @@
 import json
+import orjson
 from azure.storage.filedatalake import DataLakeServiceClient, FileSystemClient
 from datetime import datetime
 from typing import Any, Dict
@@ -44,9 +45,8 @@ class DataLakeWriter:
             # Get file system client
             file_system_client: FileSystemClient = self.client.get_file_system_client(file_system)
 
-            # Convert data to JSON string and bytes
-            json_data = json.dumps(data, indent=4)
-            json_bytes = json_data.encode('utf-8')
+            # Serialize straight to compact UTF-8 bytes
+            json_bytes = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
 
             # Create file and write data to it
             file_client = file_system_client.create_file(file_name)
@@ -54,10 +54,10 @@ class DataLakeWriter:
             file_client.flush_data(len(json_bytes))
 
             # Log successful write operation
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Write data', f'Data written to {file_name} in {file_system}')
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', f'Data written to {file_name} in {file_system}')
         except Exception as e:
             # Log any exceptions that occur during the write operation
-            self.logger.write_log('datalake_writer', 'ERROR', 'Write data', f'Error writing data to {file_name}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', f'Error writing data to {file_name}: {str(e)}')
             raise
 
     def read_json_data(self, file_system: str, file_name: str) -> Dict[str, Any]:
@@ -87,12 +87,12 @@ class DataLakeWriter:
             data = json.loads(file_content)
 
             # Log successful read operation
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Read data', f'Data read from {file_name} in {file_system}')
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', f'Data read from {file_name} in {file_system}')
             
             return data
         except Exception as e:
             # Log any exceptions that occur during the read operation
-            self.logger.write_log('datalake_writer', 'ERROR', 'Read data', f'Error reading data from {file_name}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', f'Error reading data from {file_name}: {str(e)}')
             raise
 
     def list_files(self, file_system: str):
@@ -119,12 +119,12 @@ class DataLakeWriter:
             file_list = [path.name for path in paths if not path.is_directory]
             
             # Log the successful listing of files
-            self.logger.write_log('datalake_writing', 'DEBUG', 'List files', f'Files listed in {file_system}: {file_list}')
+            self.logger.write_log('datalake_writer', 'List files', 'DEBUG', f'Files listed in {file_system}: {file_list}')
             
             return file_list
         except Exception as e:
             # Log any exceptions that occur during the listing operation
-            self.logger.write_log('datalake_writing', 'ERROR', 'List files', f'Error listing files in {file_system}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'List files', 'ERROR', f'Error listing files in {file_system}: {str(e)}')
             raise
 
     def write_parquet_data(self, df: pd.DataFrame, file_system: str, file_name: str) -> None:
@@ -158,10 +158,10 @@ class DataLakeWriter:
             file_client.append_data(data=parquet_bytes, offset=0, length=len(parquet_bytes))
             file_client.flush_data(len(parquet_bytes))
 
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Write data', 
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', 
                                 f'Parquet data written to {file_name} in {file_system}')
         except Exception as e:
-            self.logger.write_log('datalake_writer', 'ERROR', 'Write data', 
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', 
                                 f'Error writing parquet data to {file_name}: {str(e)}')
             raise
 
@@ -192,11 +192,11 @@ class DataLakeWriter:
             buffer = BytesIO(parquet_bytes)
             df = pd.read_parquet(buffer)
 
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Read data', 
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', 
                                 f'Parquet data read from {file_name} in {file_system}')
             return df
         except Exception as e:
-            self.logger.write_log('datalake_writer', 'ERROR', 'Read data', 
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', 
                                 f'Error reading parquet data from {file_name}: {str(e)}')
             raise
 
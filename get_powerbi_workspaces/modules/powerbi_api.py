@@ -22,14 +22,12 @@ class PowerBIRestAPI(MicrosoftAPI):
         scope: str = "https://analysis.windows.net/powerbi/api/.default"
         super().__init__(base_url, scope, client, secret_client, logger)
 
-    def get_workspaces(self, top: int = 500, skip: int = 0, data: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
+    def get_workspaces(self, top: int = 500) -> List[Dict[str, Any]]:
         """
         Retrieve a list of workspaces from the Power BI API, handling pagination.
 
         Args:
             top (int): Maximum number of workspaces to retrieve in one request.
-            skip (int): Number of workspaces to skip for pagination.
-            data (List[Dict[str, Any]]): List to accumulate retrieved workspaces.
 
         Returns:
             List[Dict[str, Any]]: List of all workspaces retrieved from the API.
@@ -37,16 +35,20 @@ class PowerBIRestAPI(MicrosoftAPI):
         Raises:
             Exception: If workspace retrieval fails.
         """
+        data: List[Dict[str, Any]] = []
+        skip = 0
         try:
-            response: requests.Response = self.make_request('GET', f'admin/groups?$top={top}&$skip={skip}')
-            result: List[Dict[str, Any]] = response.json().get('value', [])
-            data.extend(result)
+            while True:
+                response: requests.Response = self.make_request('GET', f'admin/groups?$top={top}&$skip={skip}')
+                result: List[Dict[str, Any]] = response.json().get('value', [])
+                data.extend(result)
+
+                self.logger.write_log(self.client, 'Get Workspaces', 'DEBUG', f'Retrieved {len(result)} workspaces (skip={skip}). Total workspaces: {len(data)}')
 
-            self.logger.write_log(self.client, 'Get Workspaces', 'DEBUG', f'Retrieved {len(result)} workspaces (skip={skip}). Total workspaces: {len(data)}')
+                if len(result) < top:
+                    break
+                skip += top
 
-            if len(result) == top:
-                return self.get_workspaces(top, skip + top, data)
-            
             self.logger.write_log(self.client, 'Get Workspaces', 'INFO', f'Successfully retrieved a total of {len(data)} workspaces')
             return data
         except Exception as e:
@@ -113,14 +115,12 @@ class PowerBIRestAPI(MicrosoftAPI):
         self.logger.write_log(self.client, 'Get Workspace Scans', 'INFO', f'Successfully retrieved scan results for {len(scan_ids)} workspace(s). Total results: {len(data)}')
         return data
     
-    def get_tenant_activities(self, date: datetime, continuation_token: Optional[str] = None, data: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    def get_tenant_activities(self, date: datetime) -> List[Dict[str, Any]]:
         """
         Retrieve tenant activities for a specific date, handling pagination with continuation tokens.
 
         Args:
             date (datetime): The date for which to retrieve activities.
-            continuation_token (Optional[str]): Token for continuing a previous request.
-            data (Optional[List[Dict[str, Any]]]): Accumulated data from previous calls.
 
         Returns:
             List[Dict[str, Any]]: List of dictionaries containing tenant activity data.
@@ -128,38 +128,29 @@ class PowerBIRestAPI(MicrosoftAPI):
         Raises:
             requests.RequestException: If tenant activity retrieval fails.
         """
+        start_time: str = date.strftime("%Y-%m-%dT00:00:00.000Z")
+        end_time: str = date.strftime("%Y-%m-%dT23:59:59.000Z")
+        endpoint_url: str = f"admin/activityevents?startDateTime='{start_time}'&endDateTime='{end_time}'&$filter=Activity eq 'ViewReport'"
+        data: List[Dict[str, Any]] = []
+
         try:
-            if data is None:
-                data = []
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', 'Initializing new data list')
-
-            if not continuation_token:
-                start_time: str = date.strftime("%Y-%m-%dT00:00:00.000Z")
-                end_time: str = date.strftime("%Y-%m-%dT23:59:59.000Z")
-                endpoint_url: str = f"admin/activityevents?startDateTime='{start_time}'&endDateTime='{end_time}'&$filter=Activity eq 'ViewReport'"
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Fetching activities for date: {date.date()}')
-            else:
-                endpoint_url: str = f"admin/activityevents?continuationToken='{continuation_token}'"
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', f'Using continuation token for pagination. Current data count: {len(data)}')
-
-            response: Dict[str, Any] = self.make_request("GET", endpoint=endpoint_url).json()
-            self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', 'Successfully received response from API')
-
-            new_activities = response.get('activityEventEntities', [])
-            data.extend(new_activities)
-            
-            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Added {len(new_activities)} activities to data. Total activities: {len(data)}')
-
-            token: Optional[str] = response.get('continuationToken')
-            if token:
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', f'Continuation token found, making recursive call. Current data count: {len(data)}')
-                return self.get_tenant_activities(date, token, data)
-            else:
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Completed fetching all activities for date: {date.date()}. Total activities: {len(data)}')
-                return data
+            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Fetching activities for date: {date.date()}')
+
+            while True:
+                response: Dict[str, Any] = self.make_request("GET", endpoint=endpoint_url).json()
+
+                new_activities = response.get('activityEventEntities', [])
+                data.extend(new_activities)
+                self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Added {len(new_activities)} activities to data. Total activities: {len(data)}')
+
+                token: Optional[str] = response.get('continuationToken')
+                if not token:
+                    break
+                endpoint_url = f"admin/activityevents?continuationToken='{token}'"
+
+            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Completed fetching all activities for date: {date.date()}. Total activities: {len(data)}')
+            return data
 
         except requests.RequestException as e:
             self.logger.write_log(self.client, 'Get Tenant Activities', 'ERROR', f'Failed to get tenant activities: {str(e)}')
             raise
-
-
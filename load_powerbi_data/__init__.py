@@ -4,7 +4,8 @@ from datetime import datetime
 
 from functions.credentials import get_credentials
 from functions.clients import initialize_clients
-from functions.save_logs import save_logs
+from functions.save_logs import flush_with_logs
+from functions.runtime import run
 from .load_powerbi import load_power_bi_data
 
 def main(mytimer: func.TimerRequest) -> None:
@@ -12,11 +13,10 @@ def main(mytimer: func.TimerRequest) -> None:
         secret_client, datalake_writer, logger = get_credentials()
         clients = initialize_clients()['powerbi']
         
-        # Process each client
+        # Clients are loaded one after another, they append to the same gold tables.
+        # Loaded together, two clients would both miss the rows the other is adding
         for client in clients:
             load_power_bi_data(client, datalake_writer, logger)
-            
-        save_logs(datalake_writer, "powerbi_load")
         
         logging.info("PowerBI data loading completed successfully")
             
@@ -25,4 +25,6 @@ def main(mytimer: func.TimerRequest) -> None:
         logging.error(error_msg)
         if 'datalake_writer' in locals():
             datalake_writer.logger.write_log('system', 'PowerBI Load', 'ERROR', error_msg)
-            save_logs(datalake_writer, "powerbi_load")
\ No newline at end of file
+    finally:
+        if 'datalake_writer' in locals():
+            run(flush_with_logs(datalake_writer, "powerbi_load"))
@@ -1,23 +1,72 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import pandas as pd
-from typing import TYPE_CHECKING
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import TYPE_CHECKING, Any, FrozenSet, Set, Tuple
 
 if TYPE_CHECKING:
     from modules.custom_logger import LoggingManager
     from modules.datalake_writer import DataLakeWriter
 
-def merge_new_rows(current_df: pd.DataFrame, silver_df: pd.DataFrame, id_column: str) -> pd.DataFrame:
+# Tables moved from silver to gold at the same time
+MAX_TABLE_WORKERS = 8
+
+# Most IDs kept in the gold part ID cache, least recently used parts are dropped first
+MAX_CACHED_IDS = 1_000_000
+
+# IDs per gold part as (part, id column) -> (etag, ids), kept by warm workers across invocations.
+# Parts are written once, so only parts that are new or were rewritten are downloaded again
+_PART_IDS: "OrderedDict[Tuple[str, str], Tuple[str, FrozenSet[Any]]]" = OrderedDict()
+_PART_IDS_LOCK = threading.Lock()
+_cached_id_count = 0
+
+def cache_part_ids(key: Tuple[str, str], etag: str, ids: FrozenSet[Any]) -> None:
     """
-    Merges rows from silver dataframe that don't exist in current dataframe based on ID column
+    Stores the IDs of a part, replacing an older version of the part and keeping at most MAX_CACHED_IDS IDs
     """
-    if current_df.empty:
-        return silver_df
-        
-    # Find rows in silver that don't exist in current based on ID
-    new_rows = silver_df[~silver_df[id_column].isin(current_df[id_column])]
-    
-    # Concatenate current data with new rows
-    return pd.concat([current_df, new_rows], ignore_index=True)
+    global _cached_id_count
+    with _PART_IDS_LOCK:
+        if key in _PART_IDS:
+            _cached_id_count -= len(_PART_IDS.pop(key)[1])
+        _PART_IDS[key] = (etag, ids)
+        _cached_id_count += len(ids)
+        while _cached_id_count > MAX_CACHED_IDS and len(_PART_IDS) > 1:
+            _cached_id_count -= len(_PART_IDS.popitem(last=False)[1][1])
+
+def select_new_rows(silver_table: pa.Table, existing_ids: Set[Any], id_column: str) -> pa.Table:
+    """
+    Selects the rows from silver table whose ID is not in the existing IDs
+    """
+    if not existing_ids:
+        return silver_table
+    silver_ids = silver_table.column(id_column)
+
+    # Anti-join in arrow's hash kernel, the value set takes the type of the silver IDs
+    value_set = pa.array(list(existing_ids), type=silver_ids.type)
+    return silver_table.filter(pc.invert(pc.is_in(silver_ids, value_set=value_set)))
+
+def load_gold_ids(writer: "DataLakeWriter", gold_name: str, id_column: str) -> Set[Any]:
+    """
+    Collects the IDs in all parts of a gold table, using the cached IDs of unchanged parts
+    """
+    def part_ids(part: str, etag: str) -> FrozenSet[Any]:
+        key = (part, id_column)
+        with _PART_IDS_LOCK:
+            cached = _PART_IDS.get(key)
+            if cached and cached[0] == etag:
+                _PART_IDS.move_to_end(key)
+                return cached[1]
+
+        ids = frozenset(writer.read_arrow_table('gold', part.removesuffix('.parquet'), columns=[id_column]).column(id_column).to_pylist())
+        cache_part_ids(key, etag, ids)
+        return ids
+
+    # The listing returns the ETags of all parts, unchanged parts need no further requests
+    parts = writer.list_parquet_part_etags('gold', gold_name)
+    with ThreadPoolExecutor(max_workers=MAX_TABLE_WORKERS) as executor:
+        return set().union(*executor.map(part_ids, parts.keys(), parts.values()))
 
 def load_power_bi_data(client: str, writer: "DataLakeWriter", logger: "LoggingManager") -> None:
     """Load Power BI data from silver to gold layer"""
@@ -28,8 +77,8 @@ def load_power_bi_data(client: str, writer: "DataLakeWriter", logger: "LoggingMa
     id_columns = {
         'users': 'graphId',
         'activities': 'Id', 
-        'user_access': 0, 
-        'workspace_content': 0
+        'user_access': 'userID', 
+        'workspace_content': 'workspaceID'
     }
 
     # Define table categories and names
@@ -38,49 +87,48 @@ def load_power_bi_data(client: str, writer: "DataLakeWriter", logger: "LoggingMa
         'facts': ['user_access', 'workspace_content', 'activities', 'azure_spend']
     }
 
-    # Process each table
-    for kind, tables in all_tables.items():
-        for name in tables:
-            try:
-                # Read silver data
-                dataframe = writer.read_parquet_data('silver', f'{silver_path}/{name}')
-                id_column = id_columns.get(name, 'id')
-                path_abbreviation = 'dim' if kind == 'dimensions' else 'fact'
-                
-                try:
-                    # Try to read existing gold data
-                    current_dataframe = writer.read_parquet_data(
-                        'gold', 
-                        f"{kind}/{path_abbreviation}_{name}"
-                    )
-                    df = merge_new_rows(current_dataframe, dataframe, id_column)
-                except Exception as e:
-                    logger.write_log(
-                        client, 
-                        'powerbi_load', 
-                        'INFO', 
-                        f"Creating new table: {name}"
-                    )
-                    df = dataframe
-
-                # Write to gold layer
-                writer.write_parquet_data(
-                    df, 
-                    'gold', 
-                    f"{kind}/{path_abbreviation}_{name}"
-                )
-                
+    def process_table(kind: str, name: str) -> None:
+        """Merge one silver table into its gold table"""
+        try:
+            # Read silver data
+            table = writer.read_arrow_table('silver', f'{silver_path}/{name}')
+            id_column = id_columns.get(name, 'id')
+            path_abbreviation = 'dim' if kind == 'dimensions' else 'fact'
+            
+            gold_name = f"{kind}/{path_abbreviation}_{name}"
+
+            # Only the IDs of the existing parts are needed to find new rows
+            current_ids = load_gold_ids(writer, gold_name, id_column)
+            if not current_ids:
                 logger.write_log(
-                    client,
-                    'powerbi_load',
-                    'INFO',
-                    f"Successfully processed {name} table"
+                    client, 
+                    'powerbi_load', 
+                    'INFO', 
+                    f"Creating new table: {name}"
                 )
+            new_rows = select_new_rows(table, current_ids, id_column)
 
-            except Exception as e:
-                logger.write_log(
-                    client,
-                    'powerbi_load',
-                    'ERROR',
-                    f"Error processing {name} table: {str(e)}"
-                ) 
\ No newline at end of file
+            # New rows go into their own part, existing parts are not rewritten
+            if new_rows.num_rows:
+                writer.append_arrow_table(new_rows, 'gold', gold_name)
+            
+            logger.write_log(
+                client,
+                'powerbi_load',
+                'INFO',
+                f"Successfully processed {name} table"
+            )
+
+        except Exception as e:
+            logger.write_log(
+                client,
+                'powerbi_load',
+                'ERROR',
+                f"Error processing {name} table: {str(e)}"
+            )
+
+    # Process the tables concurrently, each one is dominated by storage round-trips
+    with ThreadPoolExecutor(max_workers=MAX_TABLE_WORKERS) as executor:
+        for kind, tables in all_tables.items():
+            for name in tables:
+                executor.submit(process_table, kind, name)
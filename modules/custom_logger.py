@@ -1,18 +1,66 @@
+import logging
+import os
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
+
+# Kinds of log entry and their level for the python logging module
+LOG_LEVELS: Dict[str, int] = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR
+}
+
+_logger = logging.getLogger(__name__)
 
 class LoggingManager:
     """
     A class to manage logging operations.
     """
 
-    def __init__(self):
+    def __init__(self, level: Optional[str] = None):
         """
         Initialize the LoggingManager with an empty list of logging rows.
+
+        Args:
+            level (Optional[str]): Lowest kind of entry to keep, defaults to the LOG_LEVEL
+                environment variable or DEBUG.
         """
+        self.level: int = LOG_LEVELS.get((level or os.getenv('LOG_LEVEL', 'DEBUG')).upper(), logging.DEBUG)
         self.logging_rows: List[Dict[str, str]] = []
+        self._last_second: int = -1
+        self._date_str: str = ''
+        self._time_str: str = ''
+
+    def _timestamp(self) -> tuple:
+        """
+        Return the formatted date and time, formatting at most once per second.
+
+        Returns:
+            tuple: The date as '%d-%m-%Y' and the time as '%H:%M:%S'.
+        """
+        second = int(time.time())
+        if second != self._last_second:
+            current_date = datetime.fromtimestamp(second)
+            self._date_str = current_date.strftime('%d-%m-%Y')
+            self._time_str = current_date.strftime("%H:%M:%S")
+            self._last_second = second
+        return self._date_str, self._time_str
+
+    def is_enabled(self, kind: str) -> bool:
+        """
+        Check whether entries of a kind are kept at the configured level.
+
+        Args:
+            kind (str): The kind or category of the log entry.
+
+        Returns:
+            bool: True when entries of this kind are written.
+        """
+        return LOG_LEVELS.get(kind, logging.INFO) >= self.level
 
-    def write_log(self, client: str, operation: str, kind: str, text: str) -> None:
+    def write_log(self, client: str, operation: str, kind: str, text: str, *args: Any) -> None:
         """
         Write a log entry with the specified information.
 
@@ -20,20 +68,26 @@ class LoggingManager:
             client (str): The client associated with the log entry.
             operation (str): The operation being performed.
             kind (str): The kind or category of the log entry.
-            text (str): The main text content of the log entry.
+            text (str): The main text content of the log entry, a %-format string when args are given.
+            *args (Any): Values for text, only formatted when the entry is kept.
 
         Returns:
             None
         """
-        current_date = datetime.now()
+        if not self.is_enabled(kind):
+            return
+        if args:
+            text = text % args
+        date_str, time_str = self._timestamp()
         log_entry: Dict[str, str] = {
             'client': client,
-            'date': current_date.strftime('%d-%m-%Y'),
-            'time': current_date.strftime("%H:%M:%S"),
+            'date': date_str,
+            'time': time_str,
             'operation': operation,
             'kind': kind,
             'text': text
         }
         if kind != "DEBUG":
-            print(log_entry.items())
+            # The Functions worker forwards logging records to the host without blocking on stdout
+            _logger.log(LOG_LEVELS.get(kind, logging.INFO), '%s | %s | %s', client, operation, text)
         self.logging_rows.append(log_entry)
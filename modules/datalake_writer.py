@@ -1,9 +1,104 @@
 
 
-import json
-from azure.storage.filedatalake import DataLakeServiceClient, FileSystemClient
+import asyncio
+import io
+import os
+import threading
+import time
+import ijson
+import orjson
+import requests
+from collections import OrderedDict
+from contextlib import contextmanager
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.filedatalake import DataLakeServiceClient, DataLakeFileClient, FileSystemClient
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pandas as pd
+
+# Row group bounds for parquet writes, few large row groups scan faster than many thin ones
+MIN_ROW_GROUP_SIZE = 50_000
+MAX_ROW_GROUP_SIZE = 1_000_000
+
+# Block size of chunked uploads, files up to this size go up in a single request
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Name of the first part of a dataset that was migrated from a single parquet file
+LEGACY_PART_NAME = 'part-00000000000000000000.parquet'
+
+# Downloaded JSON files kept per worker, bounded by their total size; larger files are never cached
+JSON_CACHE_MAX_BYTES = 64 * 1024 * 1024
+JSON_CACHE_MAX_FILE_SIZE = 8 * 1024 * 1024
+JSON_CACHE_TTL_SECONDS = 3600
+
+# Raw JSON as (etag, bytes, expiry) per (account, file system, file name), shared by all writers of the worker.
+# The bytes are parsed on every read, so callers never share mutable objects
+_JSON_CACHE: "OrderedDict[Tuple[str, str, str], Tuple[str, bytes, float]]" = OrderedDict()
+_JSON_CACHE_LOCK = threading.Lock()
+_json_cache_bytes = 0
+
+# Encoding options shared by all parquet writes
+PARQUET_WRITE_OPTIONS: Dict[str, Any] = {
+    'compression': 'zstd',
+    'compression_level': 3,
+    'use_dictionary': True,
+    'write_statistics': True,
+    'data_page_size': 1 << 20
+}
+
+
+def cache_json(key: Tuple[str, str, str], etag: str, raw: bytes) -> None:
+    """Store the raw bytes of a JSON file, replacing its older version and evicting the least recently used files"""
+    global _json_cache_bytes
+    with _JSON_CACHE_LOCK:
+        if key in _JSON_CACHE:
+            _json_cache_bytes -= len(_JSON_CACHE.pop(key)[1])
+        _JSON_CACHE[key] = (etag, raw, time.monotonic() + JSON_CACHE_TTL_SECONDS)
+        _json_cache_bytes += len(raw)
+        while _json_cache_bytes > JSON_CACHE_MAX_BYTES:
+            _json_cache_bytes -= len(_JSON_CACHE.popitem(last=False)[1][1])
+
+
+class DataLakeFile(io.RawIOBase):
+    """
+    A read-only, seekable file over an ADLS Gen2 file that downloads only the byte ranges that are read.
+
+    Lets pyarrow fetch the parquet footer and the column chunks it needs instead of the whole file.
+    """
+
+    def __init__(self, file_client: DataLakeFileClient):
+        self.file_client = file_client
+        self.size: int = file_client.get_file_properties().size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self.file_client.download_file(offset=self.position, length=length).readall()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
 
 
 class DataLakeWriter:
@@ -13,18 +108,45 @@ class DataLakeWriter:
     Attributes:
         client (DataLakeServiceClient): The client used to interact with ADLS Gen2.
         logger (LoggingManager): A logger instance to log operations.
+        session (requests.Session): Keep-alive HTTP session shared by all requests of the client.
     """
 
-    def __init__(self, connection_string: str, logger: Any):
+    def __init__(self, connection_string: str, logger: Any, max_connections: int = 64, max_concurrency: int = 8):
         """
         Initializes the DataLakeWriter with the connection string and logger instance.
 
         Args:
             connection_string (str): The connection string for Azure Data Lake Storage Gen2.
             logger (LoggingManager): An instance of the LoggingManager to store logs.
+            max_connections (int): Size of the connection pool, should cover the number of concurrent writes.
+            max_concurrency (int): Parallel block uploads per large file.
         """
-        self.client = DataLakeServiceClient.from_connection_string(connection_string)
+        # One pooled session, so concurrent reads/writes reuse open TLS connections
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        transport = RequestsTransport(session=self.session, session_owner=False)
+        self.client = DataLakeServiceClient.from_connection_string(connection_string, transport=transport)
         self.logger = logger
+        self.max_concurrency = max_concurrency
+        self._file_systems: Dict[str, FileSystemClient] = {}
+        self._pending: List[Tuple[Any, str, str]] = []
+
+    def get_file_system_client(self, file_system: str) -> FileSystemClient:
+        """
+        Returns the client of a file system, created once per writer.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system.
+
+        Returns:
+            FileSystemClient: The client for the file system.
+        """
+        if file_system not in self._file_systems:
+            self._file_systems[file_system] = self.client.get_file_system_client(file_system)
+        return self._file_systems[file_system]
 
     def write_json_data(self, data: Dict[str, Any], file_system: str, file_name: str) -> None:
         """
@@ -39,29 +161,59 @@ class DataLakeWriter:
             Exception: If there's an error writing the data to ADLS.
         """
         try:
-            # Get file system client
-            file_system_client: FileSystemClient = self.client.get_file_system_client(file_system)
-
-            # Convert data to JSON string and bytes
-            json_data = json.dumps(data, indent=4)
-            json_bytes = json_data.encode('utf-8')
+            # Serialize straight to UTF-8 bytes
+            json_bytes = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
 
-            # Create file and write data to it
-            file_client = file_system_client.create_file(file_name)
-            file_client.append_data(data=json_bytes, offset=0, length=len(json_bytes))
-            file_client.flush_data(len(json_bytes))
+            # Create or replace the file, large files go up in concurrent blocks of known length
+            self.upload_file(pa.py_buffer(json_bytes), file_system, file_name)
 
             # Log successful write operation
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Write data', f'Data written to {file_name} in {file_system}')
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', f'Data written to {file_name} in {file_system}')
         except Exception as e:
             # Log any exceptions that occur during the write operation
-            self.logger.write_log('datalake_writer', 'ERROR', 'Write data', f'Error writing data to {file_name}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', f'Error writing data to {file_name}: {str(e)}')
             raise
 
+    def enqueue_write(self, data: Any, file_system: str, file_name: str) -> None:
+        """
+        Queues JSON data to be written by the next flush.
+
+        Args:
+            data (Any): The JSON data to be written.
+            file_system (str): The name of the ADLS Gen2 file system.
+            file_name (str): The name of the file where the data will be written.
+        """
+        self._pending.append((data, file_system, file_name))
+
+    async def flush(self, batch_size: int = 16) -> None:
+        """
+        Writes all queued JSON data, submitting up to batch_size writes at a time.
+
+        Args:
+            batch_size (int): Maximum number of writes in flight.
+
+        Raises:
+            Exception: The first error, after all queued writes have been attempted.
+        """
+        errors: List[BaseException] = []
+        while self._pending:
+            batch, self._pending = self._pending[:batch_size], self._pending[batch_size:]
+            results = await asyncio.gather(
+                *[asyncio.to_thread(self.write_json_data, *write) for write in batch],
+                return_exceptions=True
+            )
+            errors.extend(result for result in results if isinstance(result, BaseException))
+
+        if errors:
+            raise errors[0]
+
     def read_json_data(self, file_system: str, file_name: str) -> Dict[str, Any]:
         """
         Reads JSON data from the specified file in the ADLS Gen2 file system.
 
+        The raw bytes of files up to JSON_CACHE_MAX_FILE_SIZE are cached by ETag for JSON_CACHE_TTL_SECONDS,
+        so an unchanged file is not downloaded again.
+
         Args:
             file_system (str): The name of the ADLS Gen2 file system.
             file_name (str): The name of the file to read data from.
@@ -74,31 +226,106 @@ class DataLakeWriter:
         """
         try:
             # Get file system client and file client
-            file_system_client: FileSystemClient = self.client.get_file_system_client(file_system)
+            file_system_client: FileSystemClient = self.get_file_system_client(file_system)
             file_client = file_system_client.get_file_client(file_name)
 
-            # Download the file content
-            download_stream = file_client.download_file()
-            file_content = download_stream.readall().decode('utf-8')
+            # The ETag changes whenever the file is rewritten
+            properties = file_client.get_file_properties()
+            cache_key = (self.client.account_name, file_system, file_name)
+            with _JSON_CACHE_LOCK:
+                etag, raw, expires = _JSON_CACHE.get(cache_key, ('', b'', 0.0))
+                cached = etag == properties.etag and time.monotonic() < expires
+                if cached:
+                    _JSON_CACHE.move_to_end(cache_key)
 
-            # Parse and return JSON data
-            data = json.loads(file_content)
+            if cached:
+                self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', f'Data of {file_name} in {file_system} served from cache')
+            else:
+                downloader = file_client.download_file()
+                raw = downloader.readall()
+                if len(raw) <= JSON_CACHE_MAX_FILE_SIZE:
+                    # Stored with the ETag of the downloaded version, in case the file changed in between
+                    cache_json(cache_key, downloader.properties.etag, raw)
+
+            # Parse the raw bytes, orjson decodes UTF-8 itself
+            data = orjson.loads(raw)
 
             # Log successful read operation
-            self.logger.write_log('datalake_writer', 'DEBUG', 'Read data', f'Data read from {file_name} in {file_system}')
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', f'Data read from {file_name} in {file_system}')
             
             return data
         except Exception as e:
             # Log any exceptions that occur during the read operation
-            self.logger.write_log('datalake_writer', 'ERROR', 'Read data', f'Error reading data from {file_name}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', f'Error reading data from {file_name}: {str(e)}')
             raise
 
-    def list_files(self, file_system: str):
+    def iter_json_items(self, file_system: str, file_name: str, prefix: str = 'item') -> Iterator[Any]:
         """
-        Lists all files in the specified ADLS Gen2 file system.
+        Parses the items of a JSON file while it is downloaded, without holding the whole document.
 
         Args:
             file_system (str): The name of the ADLS Gen2 file system.
+            file_name (str): The name of the file to read data from.
+            prefix (str): ijson prefix of the items, 'item' for the elements of a top-level array.
+
+        Yields:
+            Any: The parsed items, one at a time.
+
+        Raises:
+            Exception: If there's an error reading the data from ADLS.
+        """
+        try:
+            file_client = self.get_file_system_client(file_system).get_file_client(file_name)
+
+            # The buffer downloads the file in ranges of UPLOAD_CHUNK_SIZE as the parser consumes it
+            with io.BufferedReader(DataLakeFile(file_client), buffer_size=UPLOAD_CHUNK_SIZE) as stream:
+                yield from ijson.items(stream, prefix, use_float=True)
+
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', f'Data streamed from {file_name} in {file_system}')
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', f'Error streaming data from {file_name}: {str(e)}')
+            raise
+
+    def read_arrow_json(self, file_system: str, file_name: str) -> pa.Table:
+        """
+        Reads a JSON array of records from the specified file in the ADLS Gen2 file system into an Arrow table.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system.
+            file_name (str): The name of the file to read data from.
+
+        Returns:
+            pa.Table: One row per record, one column per key found in any record.
+
+        Raises:
+            Exception: If there's an error reading the data from ADLS.
+        """
+        try:
+            # Get file system client and file client
+            file_system_client: FileSystemClient = self.get_file_system_client(file_system)
+            file_client = file_system_client.get_file_client(file_name)
+
+            # Download and parse the file content
+            records = orjson.loads(file_client.download_file().readall())
+
+            # pa.array infers the struct type over all records, Table.from_pylist would only look at the first
+            table = pa.Table.from_struct_array(pa.array(records)) if records else pa.table({})
+
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', f'Arrow data read from {file_name} in {file_system}')
+
+            return table
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', f'Error reading arrow data from {file_name}: {str(e)}')
+            raise
+
+    def list_files(self, file_system: str, path: Optional[str] = None, recursive: bool = True) -> List[str]:
+        """
+        Lists the files in the specified ADLS Gen2 file system, optionally below a directory.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system.
+            path (Optional[str]): Directory to list, the root of the file system when omitted.
+            recursive (bool): Whether to include files in subdirectories.
 
         Returns:
             List[str]: A list of file paths within the specified file system.
@@ -108,23 +335,284 @@ class DataLakeWriter:
         """
         try:
             # Get the file system client
-            file_system_client: FileSystemClient = self.client.get_file_system_client(file_system)
+            file_system_client: FileSystemClient = self.get_file_system_client(file_system)
             
-            # List all paths (files and directories)
-            paths = file_system_client.get_paths()
+            # List the paths below the directory, the SDK fetches them page by page
+            paths = file_system_client.get_paths(path=path, recursive=recursive)
             
             # Collect file paths into a list
-            file_list = [path.name for path in paths if not path.is_directory]
+            file_list = [item.name for item in paths if not item.is_directory]
             
-            # Log the successful listing of files
-            self.logger.write_log('datalake_writing', 'DEBUG', 'List files', f'Files listed in {file_system}: {file_list}')
+            # Log only the count, the full listing can be megabytes of text
+            self.logger.write_log('datalake_writer', 'List files', 'DEBUG', f'{len(file_list)} files listed in {file_system}/{path or ""}')
             
             return file_list
         except Exception as e:
             # Log any exceptions that occur during the listing operation
-            self.logger.write_log('datalake_writing', 'ERROR', 'List files', f'Error listing files in {file_system}: {str(e)}')
+            self.logger.write_log('datalake_writer', 'List files', 'ERROR', f'Error listing files in {file_system}: {str(e)}')
             raise
 
+    def upload_file(self, data: pa.Buffer, file_system: str, file_name: str) -> None:
+        """
+        Uploads an Arrow buffer to a file in the ADLS Gen2 file system, overwriting it.
 
+        The buffer is streamed in UPLOAD_CHUNK_SIZE blocks over max_concurrency connections,
+        so only the blocks in flight are copied into Python bytes.
 
+        Args:
+            data (pa.Buffer): The file content
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The full name of the file, including its extension
+        """
+        file_client = self.get_file_system_client(file_system).get_file_client(file_name)
+        file_client.upload_data(
+            pa.BufferReader(data),
+            length=data.size,
+            overwrite=True,
+            max_concurrency=self.max_concurrency,
+            chunk_size=UPLOAD_CHUNK_SIZE
+        )
+
+    def write_parquet_data(self, df: pd.DataFrame, file_system: str, file_name: str) -> None:
+        """
+        Writes DataFrame to a parquet file in the ADLS Gen2 file system.
 
+        Args:
+            df (pd.DataFrame): The DataFrame to be written
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file where the data will be written
+        """
+        try:
+            # Convert DataFrame to parquet bytes with optimized settings
+            table = pa.Table.from_pandas(df, preserve_index=False, nthreads=os.cpu_count())
+            sink = pa.BufferOutputStream()
+            pq.write_table(
+                table,
+                sink,
+                row_group_size=min(MAX_ROW_GROUP_SIZE, max(MIN_ROW_GROUP_SIZE, len(df))),
+                **PARQUET_WRITE_OPTIONS
+            )
+
+            # getvalue hands over the written arrow buffer without copying it
+            self.upload_file(sink.getvalue(), file_system, f"{file_name}.parquet")
+
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', 
+                                f'Parquet data written to {file_name} in {file_system}')
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', 
+                                f'Error writing parquet data to {file_name}: {str(e)}')
+            raise
+
+    def write_arrow_table(self, table: pa.Table, file_system: str, file_name: str) -> None:
+        """
+        Writes an Arrow table to a parquet file in the ADLS Gen2 file system, without a pandas round-trip.
+
+        Args:
+            table (pa.Table): The Arrow table to be written
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file where the data will be written
+        """
+        try:
+            # Dictionary encoding + zstd keeps the string heavy tables small
+            sink = pa.BufferOutputStream()
+            pq.write_table(
+                table,
+                sink,
+                row_group_size=min(MAX_ROW_GROUP_SIZE, max(MIN_ROW_GROUP_SIZE, table.num_rows)),
+                **PARQUET_WRITE_OPTIONS
+            )
+
+            # getvalue hands over the written arrow buffer without copying it
+            self.upload_file(sink.getvalue(), file_system, f"{file_name}.parquet")
+
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', 
+                                f'Arrow table written to {file_name} in {file_system}')
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', 
+                                f'Error writing arrow table to {file_name}: {str(e)}')
+            raise
+
+    @contextmanager
+    def parquet_writer(self, schema: pa.Schema, file_system: str, file_name: str) -> Iterator[pq.ParquetWriter]:
+        """
+        Opens a parquet writer for tables that arrive in batches, the file is uploaded when the block exits.
+
+        Every written batch is encoded and compressed right away, so only the compressed file stays in memory.
+
+        Args:
+            schema (pa.Schema): The schema of all written batches
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file where the data will be written
+
+        Yields:
+            pq.ParquetWriter: The writer to write the batches with
+        """
+        sink = pa.BufferOutputStream()
+        with pq.ParquetWriter(sink, schema, **PARQUET_WRITE_OPTIONS) as writer:
+            yield writer
+
+        try:
+            self.upload_file(sink.getvalue(), file_system, f"{file_name}.parquet")
+
+            self.logger.write_log('datalake_writer', 'Write data', 'DEBUG', 
+                                f'Parquet batches written to {file_name} in {file_system}')
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Write data', 'ERROR', 
+                                f'Error writing parquet batches to {file_name}: {str(e)}')
+            raise
+
+    def read_arrow_table(self, file_system: str, file_name: str, columns: Optional[List[str]] = None, 
+                         filters: Optional[List[Tuple[str, str, Any]]] = None) -> pa.Table:
+        """
+        Reads a parquet file from the ADLS Gen2 file system into an Arrow table, without a pandas round-trip.
+
+        The file is read with ranged downloads, so only the footer and the selected columns are transferred.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file to read data from
+            columns (Optional[List[str]]): Columns to read, all columns when omitted
+            filters (Optional[List[Tuple[str, str, Any]]]): Row filters as (column, op, value), row groups
+                whose statistics rule them out are skipped
+
+        Returns:
+            pa.Table: The table read from the parquet file
+        """
+        try:
+            # Parquet writers always add the extension, so readers do the same
+            file_client = self.get_file_system_client(file_system).get_file_client(f"{file_name}.parquet")
+
+            # Read the needed row groups and columns straight from storage
+            table = pq.read_table(DataLakeFile(file_client), columns=columns, filters=filters)
+
+            self.logger.write_log('datalake_writer', 'Read data', 'DEBUG', 
+                                f'Parquet data read from {file_name} in {file_system}')
+            return table
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'Read data', 'ERROR', 
+                                f'Error reading parquet data from {file_name}: {str(e)}')
+            raise
+
+    def write_workspaces_manifest(self, workspaces: Dict[str, List[Dict[str, Any]]], file_system: str, file_name: str) -> None:
+        """
+        Writes the workspaces of all clients to a single parquet file, with the client as a column.
+
+        Args:
+            workspaces (Dict[str, List[Dict[str, Any]]]): The workspaces per client
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file where the data will be written
+        """
+        rows = [
+            {'client': client, **workspace}
+            for client, client_workspaces in workspaces.items() for workspace in client_workspaces
+        ]
+
+        # Struct inference unifies the keys of all rows, clients do not return the same fields
+        if rows:
+            table = pa.Table.from_struct_array(pa.array(rows))
+        else:
+            table = pa.table({'client': pa.array([], type=pa.string())})
+        self.write_arrow_table(table, file_system, file_name)
+
+    def read_parquet_data(self, file_system: str, file_name: str, columns: Optional[List[str]] = None, 
+                          filters: Optional[List[Tuple[str, str, Any]]] = None) -> pd.DataFrame:
+        """
+        Reads parquet data from the specified file in the ADLS Gen2 file system.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The name of the file to read data from
+            columns (Optional[List[str]]): Columns to read, all columns when omitted
+            filters (Optional[List[Tuple[str, str, Any]]]): Row filters as (column, op, value)
+
+        Returns:
+            pd.DataFrame: The DataFrame read from the parquet file
+        """
+        return self.read_arrow_table(file_system, file_name, columns, filters).to_pandas()
+
+    def exists(self, file_system: str, file_name: str) -> bool:
+        """
+        Checks whether a file exists, without reading it.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system
+            file_name (str): The full name of the file
+
+        Returns:
+            bool: True when the file exists
+        """
+        try:
+            return self.get_file_system_client(file_system).get_file_client(file_name).exists()
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'File exists', 'ERROR', 
+                                f'Error checking whether {file_name} exists: {str(e)}')
+            raise
+
+    def list_parquet_parts(self, file_system: str, path: str) -> List[str]:
+        """
+        Lists the part files of a parquet dataset directory, oldest first.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system
+            path (str): The directory of the dataset
+
+        Returns:
+            List[str]: The paths of the part files, empty when the dataset does not exist
+        """
+        return list(self.list_parquet_part_etags(file_system, path))
+
+    def list_parquet_part_etags(self, file_system: str, path: str) -> Dict[str, str]:
+        """
+        Lists the part files of a parquet dataset directory with their ETags, oldest first.
+
+        The ETags come with the directory listing, so no request per part is needed. A table that was still
+        stored as a single `{path}.parquet` file is moved into the directory as its first part.
+
+        Args:
+            file_system (str): The name of the ADLS Gen2 file system
+            path (str): The directory of the dataset
+
+        Returns:
+            Dict[str, str]: The ETag per part file path, empty when the dataset does not exist
+        """
+        try:
+            file_system_client = self.get_file_system_client(file_system)
+            if not file_system_client.get_directory_client(path).exists():
+                legacy_file = file_system_client.get_file_client(f"{path}.parquet")
+                if not legacy_file.exists():
+                    return {}
+                file_system_client.create_directory(path)
+                try:
+                    legacy_file.rename_file(f"{file_system}/{path}/{LEGACY_PART_NAME}")
+                except ResourceNotFoundError:
+                    # Another writer moved the file first, the dataset exists either way
+                    if not file_system_client.get_file_client(f"{path}/{LEGACY_PART_NAME}").exists():
+                        raise
+                self.logger.write_log('datalake_writer', 'List parts', 'INFO', f'Moved {path}.parquet into dataset {path}')
+
+            parts = {
+                item.name: item.etag
+                for item in file_system_client.get_paths(path=path, recursive=False)
+                if not item.is_directory and item.name.endswith('.parquet')
+            }
+
+            # Part names start with their write time, so sorting keeps them in write order
+            return {name: parts[name] for name in sorted(parts)}
+        except Exception as e:
+            self.logger.write_log('datalake_writer', 'List parts', 'ERROR', 
+                                f'Error listing parquet parts of {path}: {str(e)}')
+            raise
+
+    def append_arrow_table(self, table: pa.Table, file_system: str, path: str) -> None:
+        """
+        Appends an Arrow table to a parquet dataset by writing it as a new part file.
+
+        Only the appended rows are encoded and uploaded, existing parts are left untouched.
+
+        Args:
+            table (pa.Table): The rows to append
+            file_system (str): The name of the ADLS Gen2 file system
+            path (str): The directory of the dataset
+        """
+        part_name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        self.write_arrow_table(table, file_system, f"{path}/{part_name}")
@@ -2,8 +2,17 @@ from modules.microsoft_authentication import MicrosoftAPI
 from azure.keyvault.secrets import SecretClient
 from modules.custom_logger import LoggingManager
 from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import requests
 
+# Concurrent license requests, bounded to stay under Graph throttling
+MAX_LICENSE_WORKERS = 32
+
+# Largest page size Graph allows for /users, and the user fields that are stored
+USERS_PAGE_SIZE = 999
+USER_FIELDS = ['id', 'displayName', 'userPrincipalName', 'mail', 'accountEnabled', 'assignedLicenses']
+
 class GraphAPI(MicrosoftAPI):
     """Class for Microsoft Graph API interactions."""
 
@@ -20,13 +29,9 @@ class GraphAPI(MicrosoftAPI):
         scope: str = "https://graph.microsoft.com/.default"
         super().__init__(base_url, scope, client, secret_client, logger)
 
-    def list_all_users(self, next_link: Optional[str] = None, data: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    def list_all_users(self) -> List[Dict[str, Any]]:
         """
-        Retrieve a list of all users recursively.
-
-        Args:
-            next_link (Optional[str]): The URL for the next page of results.
-            data (Optional[List[Dict[str, Any]]]): Accumulated user data from previous calls.
+        Retrieve a list of all users by following the result pages.
 
         Returns:
             List[Dict[str, Any]]: List containing all user data.
@@ -34,25 +39,28 @@ class GraphAPI(MicrosoftAPI):
         Raises:
             requests.RequestException: If user retrieval fails.
         """
-        if data is None:
-            data = []
+        pages: List[List[Dict[str, Any]]] = []
+        total = 0
+        url: Optional[str] = f"/users?$top={USERS_PAGE_SIZE}&$select={','.join(USER_FIELDS)}"
+        headers: Dict[str, str] = {"ConsistencyLevel": "eventual"}
 
         try:
-            self.logger.write_log(self.client, 'List All Users', 'INFO', f'Retrieving users. Current user count: {len(data)}')
-            url = next_link.split("v1.0/")[-1] if next_link else '/users'
-            response: requests.Response = self.make_request("GET", url)
-            response_json = response.json()
-
-            if 'value' in response_json:
-                new_users = response_json['value']
-                data.extend(new_users)
-                self.logger.write_log(self.client, 'List All Users', 'DEBUG', f'Retrieved {len(new_users)} users. Total users: {len(data)}')
-
-            if '@odata.nextLink' in response_json:
-                return self.list_all_users(response_json['@odata.nextLink'], data)
-            else:
-                self.logger.write_log(self.client, 'List All Users', 'INFO', f'Successfully retrieved all users. Total users: {len(data)}')
-                return data
+            while url:
+                self.logger.write_log(self.client, 'List All Users', 'DEBUG', 'Retrieving users. Current user count: %d', total)
+                response: requests.Response = self.make_request("GET", url, headers=headers)
+                response_json = response.json()
+
+                # Keep the pages as parsed and flatten them once at the end
+                new_users = response_json.get('value') or []
+                pages.append(new_users)
+                total += len(new_users)
+                self.logger.write_log(self.client, 'List All Users', 'DEBUG', 'Retrieved %d users. Total users: %d', len(new_users), total)
+
+                next_link = response_json.get('@odata.nextLink')
+                url = next_link.split("v1.0/")[-1] if next_link else None
+
+            self.logger.write_log(self.client, 'List All Users', 'INFO', f'Successfully retrieved all users. Total users: {total}')
+            return list(chain.from_iterable(pages))
         except requests.RequestException as e:
             self.logger.write_log(self.client, 'List All Users', 'ERROR', f'Failed to retrieve users: {str(e)}')
             raise
@@ -71,11 +79,35 @@ class GraphAPI(MicrosoftAPI):
             requests.RequestException: If license retrieval fails.
         """
         try:
-            self.logger.write_log(self.client, 'Get User Licenses', 'INFO', f'Retrieving licenses for user: {user_id}')
+            self.logger.write_log(self.client, 'Get User Licenses', 'DEBUG', 'Retrieving licenses for user: %s', user_id)
             response: requests.Response = self.make_request("GET", f'users/{user_id}/licenseDetails')
             license_data = response.json()
-            self.logger.write_log(self.client, 'Get User Licenses', 'INFO', f'Successfully retrieved licenses for user: {user_id}. Number of licenses: {len(license_data.get("value", []))}')
+            self.logger.write_log(self.client, 'Get User Licenses', 'DEBUG', 'Successfully retrieved licenses for user: %s. Number of licenses: %d', user_id, len(license_data.get("value", [])))
             return license_data
         except requests.RequestException as e:
             self.logger.write_log(self.client, 'Get User Licenses', 'ERROR', f'Failed to retrieve licenses for user {user_id}: {str(e)}')
-            raise
\ No newline at end of file
+            raise
+
+    def get_licenses_bulk(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve license details for many users concurrently.
+
+        Args:
+            user_ids (List[str]): The IDs of the users to query.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: License data per user ID. Users whose lookup
+                failed are left out, the failure is logged by get_users_licenses.
+        """
+        def get_licenses(user_id: str) -> Optional[Dict[str, Any]]:
+            try:
+                return self.get_users_licenses(user_id)
+            except requests.RequestException:
+                return None
+
+        with ThreadPoolExecutor(max_workers=MAX_LICENSE_WORKERS) as executor:
+            results = executor.map(get_licenses, user_ids)
+            licenses = {user_id: result for user_id, result in zip(user_ids, results) if result is not None}
+
+        self.logger.write_log(self.client, 'Get User Licenses', 'INFO', f'Retrieved licenses for {len(licenses)} of {len(user_ids)} users')
+        return licenses
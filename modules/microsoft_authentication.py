@@ -1,12 +1,142 @@
+import threading
+import time
+from functools import lru_cache
+import msal
 import requests 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from azure.keyvault.secrets import SecretClient
 from .custom_logger import LoggingManager 
-from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Tuple
+
+# Pooled connections per API, sized for concurrent request fan-out
+MAX_POOL_CONNECTIONS = 64
+
+# Retries of failed requests, waiting 0.5s, 1s, 2s, ...
+# Throttled (429) requests are retried by make_request, which pauses the shared rate limiter.
+# POSTs such as the scanner getInfo are not idempotent, they are only retried when they could not be sent
+RETRY_POLICY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False
+)
+
+# Retries of a throttled request, and the wait when the response has no Retry-After header
+MAX_THROTTLE_RETRIES = 5
+DEFAULT_RETRY_AFTER = 10
+
+# Secrets are re-fetched from Key Vault once they are older than this
+SECRET_TTL_SECONDS = 3600
+
+# Key Vault secrets as (value, expiry), shared by all API instances of the worker
+_SECRET_CACHE: Dict[str, Tuple[str, float]] = {}
+
+# MSAL applications per (tenant id, client id, client secret), each keeps its own token cache
+_APP_CACHE: Dict[Tuple[str, str, str], msal.ConfidentialClientApplication] = {}
+
+# Rate limiters per (client, endpoint family), shared by all threads of the worker
+_RATE_LIMITERS: Dict[Tuple[str, str], "TokenBucket"] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket that spaces out requests to stay within an hourly quota."""
+
+    def __init__(self, requests_per_hour: int):
+        """
+        Initialize a full TokenBucket.
+
+        Args:
+            requests_per_hour (int): Quota of the endpoint family, also the size of the bucket.
+        """
+        self.capacity: float = float(requests_per_hour)
+        self.rate: float = requests_per_hour / 3600
+        self.tokens: float = self.capacity
+        self.updated: float = time.monotonic()
+        self.paused_until: float = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Take a token, sleeping until one is available and any pause has ended.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every thread using the bucket, after the API throttled a request.
+
+        Args:
+            seconds (float): Seconds to wait before the next request.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+@lru_cache(maxsize=None)
+def get_session(base_url: str) -> requests.Session:
+    """Return the pooled session of an API, shared by all clients and warm invocations of the worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=MAX_POOL_CONNECTIONS, max_retries=RETRY_POLICY)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_rate_limiter(client: str, family: str, requests_per_hour: int) -> TokenBucket:
+    """Return the rate limiter of an endpoint family for a client, created once per worker"""
+    key = (client, family)
+    with _RATE_LIMITERS_LOCK:
+        if key not in _RATE_LIMITERS:
+            _RATE_LIMITERS[key] = TokenBucket(requests_per_hour)
+        return _RATE_LIMITERS[key]
+
+
+def get_retry_after(response: requests.Response) -> float:
+    """Seconds to wait after a throttled response, from its Retry-After header"""
+    try:
+        return float(response.headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
+def get_cached_secret(secret_manager: SecretClient, name: str) -> str:
+    """Return a Key Vault secret, fetching it again after SECRET_TTL_SECONDS"""
+    value, expires = _SECRET_CACHE.get(name, ('', 0.0))
+    if time.monotonic() >= expires:
+        value = secret_manager.get_secret(name).value
+        _SECRET_CACHE[name] = (value, time.monotonic() + SECRET_TTL_SECONDS)
+    return value
+
+
+def get_confidential_app(tenant_id: str, client_id: str, client_secret: str) -> msal.ConfidentialClientApplication:
+    """Return the MSAL application for a service principal, created once per worker"""
+    key = (tenant_id, client_id, client_secret)
+    if key not in _APP_CACHE:
+        _APP_CACHE[key] = msal.ConfidentialClientApplication(
+            client_id,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            client_credential=client_secret
+        )
+    return _APP_CACHE[key]
+
 
 class MicrosoftAPI:
     """Base class for Microsoft API interactions."""
 
+    # Hourly request quota per endpoint prefix, the first matching prefix applies
+    RATE_LIMITS: Dict[str, int] = {}
+
     def __init__(self, base_url: str, scope: str, client: str, secret_manager: SecretClient, logger: LoggingManager):
         """
         Initialize the MicrosoftAPI.
@@ -23,45 +153,40 @@ class MicrosoftAPI:
         self.client: str = client
 
         try:
-            self.tenant_id: str = secret_manager.get_secret(f"{client}-tenant-id").value
-            self.client_id: str = secret_manager.get_secret(f"{client}-client-id").value
-            self.client_secret: str = secret_manager.get_secret(f"{client}-client-secret").value
+            self.tenant_id: str = get_cached_secret(secret_manager, f"{client}-tenant-id")
+            self.client_id: str = get_cached_secret(secret_manager, f"{client}-client-id")
+            self.client_secret: str = get_cached_secret(secret_manager, f"{client}-client-secret")
         except Exception as e:
             logger.write_log(client, 'Initialization', 'ERROR', f'Failed to retrieve secrets: {str(e)}')
             raise
         
-        self.token: Optional[str] = None
-        self.expiration_time: Optional[datetime] = None
         self.logger: LoggingManager = logger
 
+        # Reuse open connections to the API instead of a new TLS handshake per client
+        self.session: requests.Session = get_session(base_url)
+
     def _get_access_token(self) -> str:
         """
         Retrieve an OAuth2 access token using client credentials.
 
+        MSAL serves the token from its cache until it is about to expire.
+
         Returns:
             str: The access token.
 
         Raises:
-            requests.RequestException: If token retrieval fails.
+            RuntimeError: If token retrieval fails.
         """
-        url: str = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
-        body: Dict[str, str] = {
-            "scope": self.scope,
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret
-        }
-
         try:
-            headers: Dict[str, str] = {"Content-Type": "application/x-www-form-urlencoded"}
-            response: requests.Response = requests.post(url, data=body, headers=headers)
-            response.raise_for_status()
-            self.token = response.json()['access_token']
-            self.expiration_time = datetime.now() + timedelta(minutes=15)
+            app = get_confidential_app(self.tenant_id, self.client_id, self.client_secret)
+            result: Dict = app.acquire_token_for_client(scopes=[self.scope])
+            if 'access_token' not in result:
+                raise RuntimeError(f"{result.get('error')}: {result.get('error_description')}")
 
-            self.logger.write_log(self.client, 'Token', 'INFO', f'Access token retrieved successfully. Token length: {len(self.token)}')
-            return self.token
-        except requests.RequestException as e:
+            if result.get('token_source') != 'cache':
+                self.logger.write_log(self.client, 'Token', 'INFO', f'Access token retrieved successfully. Token length: {len(result["access_token"])}')
+            return result['access_token']
+        except Exception as e:
             self.logger.write_log(self.client, 'Token', 'ERROR', f'Failed to retrieve access token: {str(e)}')
             raise
 
@@ -73,22 +198,40 @@ class MicrosoftAPI:
             Dict[str, str]: Headers dictionary.
         """
         try:
-            if not self.token or datetime.now() >= self.expiration_time:
-                self._get_access_token()
-            return {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+            return {"Authorization": f"Bearer {self._get_access_token()}", "Content-Type": "application/json"}
         except Exception as e:
             self.logger.write_log(self.client, 'Headers', 'ERROR', f'Failed to generate headers: {str(e)}')
             raise
 
-    def make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, payload: Optional[Dict] = None) -> requests.Response:
+    def _get_rate_limiter(self, endpoint: str) -> Optional[TokenBucket]:
+        """
+        Find the rate limiter of the endpoint family an endpoint belongs to.
+
+        Args:
+            endpoint (str): API endpoint to call.
+
+        Returns:
+            Optional[TokenBucket]: The shared rate limiter, or None if the endpoint has no quota.
+        """
+        for prefix, requests_per_hour in self.RATE_LIMITS.items():
+            if endpoint.startswith(prefix):
+                return get_rate_limiter(self.client, prefix, requests_per_hour)
+        return None
+
+    def make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, payload: Optional[Dict] = None, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
         """
         Make a dynamic request to the Microsoft API.
 
+        Requests wait for the rate limiter of their endpoint family. Throttled requests are retried
+        after the Retry-After delay, during which the rate limiter holds back the other threads.
+
         Args:
             method (str): HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
             endpoint (str): API endpoint to call.
             params (Optional[Dict]): Query parameters.
             payload (Optional[Dict]): Request payload.
+            headers (Optional[Dict[str, str]]): Extra headers for this request only.
+            stream (bool): Leave the body unread, to be consumed from response.raw.
 
         Returns:
             requests.Response: The API response.
@@ -97,12 +240,26 @@ class MicrosoftAPI:
             requests.RequestException: If the API request fails.
         """
         url: str = f"{self.base_url}{endpoint}"
-        headers: Dict[str, str] = self._get_headers()
+        headers = {**self._get_headers(), **(headers or {})}
+        rate_limiter = self._get_rate_limiter(endpoint)
 
         try:
-            response: requests.Response = requests.request(method, url, headers=headers, params=params, json=payload)
+            for attempt in range(MAX_THROTTLE_RETRIES + 1):
+                if rate_limiter:
+                    rate_limiter.acquire()
+                response: requests.Response = self.session.request(method, url, headers=headers, params=params, json=payload, stream=stream)
+                if response.status_code != 429 or attempt == MAX_THROTTLE_RETRIES:
+                    break
+
+                retry_after = get_retry_after(response)
+                self.logger.write_log(self.client, 'API Request', 'WARNING', f'Request to {url} was throttled, retrying in {retry_after} seconds')
+                if rate_limiter:
+                    rate_limiter.pause(retry_after)
+                else:
+                    time.sleep(retry_after)
+
             response.raise_for_status()
-            self.logger.write_log(self.client, 'API Request', 'INFO', f'Successfully made {method} request to {url}. Response status code: {response.status_code}')
+            self.logger.write_log(self.client, 'API Request', 'DEBUG', 'Successfully made %s request to %s. Response status code: %d', method, url, response.status_code)
             return response
         except requests.RequestException as e:
             self.logger.write_log(self.client, 'API Request', 'ERROR', f'Failed to make {method} request to {url}: {str(e)}')
@@ -2,13 +2,46 @@ from .microsoft_authentication import MicrosoftAPI
 from .custom_logger import LoggingManager
 from azure.keyvault.secrets import SecretClient
 from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+import ijson
 import requests 
+import time
 from datetime import datetime 
 
+# Concurrent page requests while paginating
+MAX_PAGE_WORKERS = 8
+# Workspaces per scan, the maximum the scanner API accepts
+SCAN_BATCH_SIZE = 100
+# Concurrent scan requests, the scanner API allows 16 simultaneous getInfo calls
+MAX_SCAN_POST_WORKERS = 4
+# Concurrent scan result requests
+MAX_SCAN_WORKERS = 8
+# Longest pause between two scan status polls, in seconds
+MAX_POLL_DELAY = 15
+
+
+@lru_cache(maxsize=32)
+def activity_events_endpoint(day: int) -> str:
+    """Endpoint of the ViewReport activity events of a day, given as its ordinal, shared by all clients"""
+    date = datetime.fromordinal(day).strftime("%Y-%m-%d")
+    return f"admin/activityevents?startDateTime='{date}T00:00:00.000Z'&endDateTime='{date}T23:59:59.000Z'&$filter=Activity eq 'ViewReport'"
+
 
 class PowerBIRestAPI(MicrosoftAPI):
     """Class for Power BI REST API interactions."""
 
+    # Power BI admin API quotas per tenant, each endpoint has its own quota so they get their own bucket
+    RATE_LIMITS: Dict[str, int] = {
+        'admin/workspaces/getInfo': 500,
+        'admin/workspaces/scanStatus': 10000,
+        'admin/workspaces/scanResult': 500,
+        'admin/activityevents': 200,
+        'admin/groups': 200,
+        'admin/': 200
+    }
+
     def __init__(self, client: str, secret_client: SecretClient, logger: LoggingManager):
         """
         Initialize the PowerBIRestAPI.
@@ -22,14 +55,15 @@ class PowerBIRestAPI(MicrosoftAPI):
         scope: str = "https://analysis.windows.net/powerbi/api/.default"
         super().__init__(base_url, scope, client, secret_client, logger)
 
-    def get_workspaces(self, top: int = 500, skip: int = 0, data: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
+    def get_workspaces(self, top: int = 500) -> List[Dict[str, Any]]:
         """
         Retrieve a list of workspaces from the Power BI API, handling pagination.
 
+        After a full first page, the following pages are requested in windows of MAX_PAGE_WORKERS
+        concurrent requests until a page comes back short.
+
         Args:
             top (int): Maximum number of workspaces to retrieve in one request.
-            skip (int): Number of workspaces to skip for pagination.
-            data (List[Dict[str, Any]]): List to accumulate retrieved workspaces.
 
         Returns:
             List[Dict[str, Any]]: List of all workspaces retrieved from the API.
@@ -37,26 +71,66 @@ class PowerBIRestAPI(MicrosoftAPI):
         Raises:
             Exception: If workspace retrieval fails.
         """
-        try:
+        def get_page(skip: int) -> List[Dict[str, Any]]:
             response: requests.Response = self.make_request('GET', f'admin/groups?$top={top}&$skip={skip}')
             result: List[Dict[str, Any]] = response.json().get('value', [])
-            data.extend(result)
-
-            self.logger.write_log(self.client, 'Get Workspaces', 'DEBUG', f'Retrieved {len(result)} workspaces (skip={skip}). Total workspaces: {len(data)}')
+            self.logger.write_log(self.client, 'Get Workspaces', 'DEBUG', 'Retrieved %d workspaces (skip=%d)', len(result), skip)
+            return result
 
-            if len(result) == top:
-                return self.get_workspaces(top, skip + top, data)
-            
+        try:
+            pages: List[List[Dict[str, Any]]] = [get_page(0)]
+            skip = top
+
+            with ThreadPoolExecutor(max_workers=MAX_PAGE_WORKERS) as executor:
+                while len(pages[-1]) == top:
+                    window = executor.map(get_page, range(skip, skip + top * MAX_PAGE_WORKERS, top))
+                    for page in window:
+                        pages.append(page)
+                        # Pages after the first short page are empty
+                        if len(page) < top:
+                            break
+                    skip += top * MAX_PAGE_WORKERS
+
+            data = list(chain.from_iterable(pages))
             self.logger.write_log(self.client, 'Get Workspaces', 'INFO', f'Successfully retrieved a total of {len(data)} workspaces')
             return data
         except Exception as e:
             self.logger.write_log(self.client, 'Get Workspaces', 'ERROR', f'Failed to get workspaces: {str(e)}')
             raise
 
+    def _post_one_scan(self, workspace_ids: List[str]) -> str:
+        """
+        Initiate a scan for one batch of workspaces.
+
+        Falls back to a scan without lineage, datasource details and dataset schemas when the full scan is refused.
+
+        Args:
+            workspace_ids (List[str]): Up to SCAN_BATCH_SIZE workspace IDs to be scanned.
+
+        Returns:
+            str: The scan ID of the initiated scan.
+
+        Raises:
+            requests.RequestException: If workspace scan initiation fails.
+        """
+        body: Dict[str, List[str]] = {"workspaces": workspace_ids}
+        url: str = "admin/workspaces/getInfo?lineage=True&datasourceDetails=True&datasetSchema=True&datasetExpressions=True&getArtifactUsers=True"
+        try:
+            response: requests.Response = self.make_request('POST', url, payload=body)
+        except requests.RequestException as e:
+            self.logger.write_log(self.client, 'GET workspace scan', 'ERROR', f'Error with normal endpoint: {e}')
+            new_url: str = "admin/workspaces/getInfo?getArtifactUsers=True"
+            response = self.make_request('POST', new_url, payload=body)
+
+        return response.json()['id']
+
     def post_workspace_scan(self, workspace_ids: List[str]) -> List[str]:
         """
         Initiate a scan for a list of workspaces.
 
+        The workspaces are scanned in batches of SCAN_BATCH_SIZE, up to MAX_SCAN_POST_WORKERS batches are posted
+        at a time.
+
         Args:
             workspace_ids (List[str]): List of workspace IDs to be scanned.
 
@@ -66,19 +140,10 @@ class PowerBIRestAPI(MicrosoftAPI):
         Raises:
             requests.RequestException: If workspace scan initiation fails.
         """
-        workspace_scan_ids: List[str] = []
-        url: str = "admin/workspaces/getInfo?lineage=True&datasourceDetails=True&datasetSchema=True&datasetExpressions=True&getArtifactUsers=True"
+        batches: List[List[str]] = [workspace_ids[i:i + SCAN_BATCH_SIZE] for i in range(0, len(workspace_ids), SCAN_BATCH_SIZE)]
         try:
-            for i in range(0, len(workspace_ids), 100):
-                body: Dict[str, List[str]] = {"workspaces": workspace_ids[i:i + 100]}
-                try:
-                    response: requests.Response = self.make_request('POST', url, payload=body)
-                except requests.RequestException as e:
-                    self.logger.write_log(self.client, 'GET workspace scan', 'ERROR', f'Error with normal endpoint: {e}')
-                    new_url: str = "admin/workspaces/getInfo?getArtifactUsers=True"
-                    response = self.make_request('POST', new_url, payload=body)
-
-                workspace_scan_ids.append(response.json()['id'])
+            with ThreadPoolExecutor(max_workers=MAX_SCAN_POST_WORKERS) as executor:
+                workspace_scan_ids: List[str] = list(executor.map(self._post_one_scan, batches))
 
             self.logger.write_log(self.client, 'Post Workspace Scan', 'INFO', f'Successfully initiated {len(workspace_scan_ids)} workspace scans. Total workspaces: {len(workspace_ids)}')
             return workspace_scan_ids
@@ -86,41 +151,119 @@ class PowerBIRestAPI(MicrosoftAPI):
             self.logger.write_log(self.client, 'Post Workspace Scan', 'ERROR', f'Failed to post workspace scan: {str(e)}')
             raise
 
+    def get_scan_status(self, scan_id: str) -> str:
+        """
+        Retrieve the status of a workspace scan.
+
+        Args:
+            scan_id (str): The scan ID returned by post_workspace_scan.
+
+        Returns:
+            str: The scan status, e.g. 'NotStarted', 'Running', 'Succeeded' or 'Failed'.
+
+        Raises:
+            requests.RequestException: If scan status retrieval fails.
+        """
+        try:
+            status: str = self.make_request('GET', f'admin/workspaces/scanStatus/{scan_id}').json()['status']
+            self.logger.write_log(self.client, 'Get Scan Status', 'DEBUG', f'Scan {scan_id} status: {status}')
+            return status
+        except requests.RequestException as e:
+            self.logger.write_log(self.client, 'Get Scan Status', 'ERROR', f'Failed to get status for scan ID {scan_id}: {str(e)}')
+            raise
+
+    def wait_for_scan(self, scan_id: str, initial: float = 1.0, max_wait: float = 300) -> None:
+        """
+        Poll the status of a workspace scan with exponential backoff until it succeeded.
+
+        Args:
+            scan_id (str): The scan ID returned by post_workspace_scan.
+            initial (float): Seconds to wait after the first poll, doubled after every poll up to MAX_POLL_DELAY.
+            max_wait (float): Seconds after which to stop waiting for the scan.
+
+        Raises:
+            RuntimeError: If the scan failed.
+            TimeoutError: If the scan did not succeed within max_wait seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        attempt = 0
+        while True:
+            status = self.get_scan_status(scan_id)
+            if status == 'Succeeded':
+                return
+            if status == 'Failed':
+                self.logger.write_log(self.client, 'Wait For Scan', 'ERROR', f'Workspace scan {scan_id} failed')
+                raise RuntimeError(f'Workspace scan failed: {scan_id}')
+
+            delay = min(initial * 2 ** attempt, MAX_POLL_DELAY)
+            if time.monotonic() + delay > deadline:
+                self.logger.write_log(self.client, 'Wait For Scan', 'ERROR', f'Workspace scan {scan_id} did not finish within {max_wait} seconds')
+                raise TimeoutError(f'Workspace scan {scan_id} did not finish within {max_wait} seconds')
+            time.sleep(delay)
+            attempt += 1
+
+    def _fetch_one_scan(self, scan_id: str) -> Dict[str, Any]:
+        """
+        Wait for a single workspace scan to succeed and retrieve its result.
+
+        Args:
+            scan_id (str): The scan ID to retrieve the result for.
+
+        Returns:
+            Dict[str, Any]: The scan result, with the 'workspaces' and 'datasourceInstances' of the scan.
+
+        Raises:
+            RuntimeError: If the scan failed.
+            TimeoutError: If the scan did not finish in time.
+            requests.RequestException: If scan result retrieval fails.
+            ijson.JSONError: If the scan result is not valid JSON.
+        """
+        self.wait_for_scan(scan_id)
+        try:
+            # Parse the body while it is read, instead of holding the raw payload and its parsed copy at once
+            response: requests.Response = self.make_request('GET', f'admin/workspaces/scanResult/{scan_id}', stream=True)
+            try:
+                response.raw.decode_content = True
+                result: Dict[str, Any] = dict(ijson.kvitems(response.raw, '', use_float=True))
+            finally:
+                response.close()
+            self.logger.write_log(self.client, 'Get Workspace Scans', 'DEBUG', 'Retrieved scan result for scan ID %s. Workspaces count: %d', scan_id, len(result.get('workspaces', [])))
+            return result
+        except (requests.RequestException, ijson.JSONError) as e:
+            self.logger.write_log(self.client, 'Get Workspace Scans', 'ERROR', f'Failed to get scan result for scan ID {scan_id}: {str(e)}')
+            raise
+
     def get_workspace_scans(self, scan_ids: List[str]) -> List[Dict[str, Any]]:
         """
         Retrieve the scan results for a list of workspace scan IDs.
 
+        The scans are awaited and their results requested concurrently, MAX_SCAN_WORKERS at a time,
+        so finished scans are fetched while others are still running.
+
         Args:
             scan_ids (List[str]): List of scan IDs to retrieve results for.
 
         Returns:
-            List[Dict[str, Any]]: List of dictionaries containing the scan results for each workspace.
+            List[Dict[str, Any]]: The scan result of each scan ID, in the order of scan_ids.
 
         Raises:
             requests.RequestException: If scan result retrieval fails.
         """
+        with ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+            data: List[Dict[str, Any]] = list(executor.map(self._fetch_one_scan, scan_ids))
 
-        data: List[Dict[str, Any]] = []
-        for scan_id in scan_ids:
-            try:
-                result: Dict[str, Any] = self.make_request('GET', f'admin/workspaces/scanResult/{scan_id}').json()
-                data.extend(result)
-                self.logger.write_log(self.client, 'Get Workspace Scans', 'DEBUG', f'Retrieved scan result for scan ID {scan_id}. Results count: {len(result)}')
-            except requests.RequestException as e:
-                self.logger.write_log(self.client, 'Get Workspace Scans', 'ERROR', f'Failed to get scan result for scan ID {scan_id}: {str(e)}')
-                raise
-
-        self.logger.write_log(self.client, 'Get Workspace Scans', 'INFO', f'Successfully retrieved scan results for {len(scan_ids)} workspace(s). Total results: {len(data)}')
+        self.logger.write_log(self.client, 'Get Workspace Scans', 'INFO', f'Successfully retrieved scan results for {len(scan_ids)} scan(s). Total workspaces: {sum(len(result.get("workspaces", [])) for result in data)}')
         return data
     
-    def get_tenant_activities(self, date: datetime, continuation_token: Optional[str] = None, data: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    def get_tenant_activities(self, date: datetime) -> List[Dict[str, Any]]:
         """
         Retrieve tenant activities for a specific date, handling pagination with continuation tokens.
 
+        The next page is requested as soon as its continuation token is known, so it is in flight
+        while the current page is collected.
+
         Args:
             date (datetime): The date for which to retrieve activities.
-            continuation_token (Optional[str]): Token for continuing a previous request.
-            data (Optional[List[Dict[str, Any]]]): Accumulated data from previous calls.
 
         Returns:
             List[Dict[str, Any]]: List of dictionaries containing tenant activity data.
@@ -128,38 +271,31 @@ class PowerBIRestAPI(MicrosoftAPI):
         Raises:
             requests.RequestException: If tenant activity retrieval fails.
         """
+        endpoint_url: str = activity_events_endpoint(date.toordinal())
+        pages: List[List[Dict[str, Any]]] = []
+        total = 0
+
         try:
-            if data is None:
-                data = []
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', 'Initializing new data list')
-
-            if not continuation_token:
-                start_time: str = date.strftime("%Y-%m-%dT00:00:00.000Z")
-                end_time: str = date.strftime("%Y-%m-%dT23:59:59.000Z")
-                endpoint_url: str = f"admin/activityevents?startDateTime='{start_time}'&endDateTime='{end_time}'&$filter=Activity eq 'ViewReport'"
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Fetching activities for date: {date.date()}')
-            else:
-                endpoint_url: str = f"admin/activityevents?continuationToken='{continuation_token}'"
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', f'Using continuation token for pagination. Current data count: {len(data)}')
-
-            response: Dict[str, Any] = self.make_request("GET", endpoint=endpoint_url).json()
-            self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', 'Successfully received response from API')
-
-            new_activities = response.get('activityEventEntities', [])
-            data.extend(new_activities)
-            
-            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Added {len(new_activities)} activities to data. Total activities: {len(data)}')
-
-            token: Optional[str] = response.get('continuationToken')
-            if token:
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', f'Continuation token found, making recursive call. Current data count: {len(data)}')
-                return self.get_tenant_activities(date, token, data)
-            else:
-                self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Completed fetching all activities for date: {date.date()}. Total activities: {len(data)}')
-                return data
+            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Fetching activities for date: {date.date()}')
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                pending: Optional[Future] = executor.submit(self.make_request, "GET", endpoint_url)
+                while pending:
+                    response: Dict[str, Any] = pending.result().json()
+
+                    # Prefetch the next page before handling this one
+                    token: Optional[str] = response.get('continuationToken')
+                    pending = executor.submit(self.make_request, "GET", f"admin/activityevents?continuationToken='{token}'") if token else None
+
+                    new_activities = response.get('activityEventEntities', [])
+                    pages.append(new_activities)
+                    total += len(new_activities)
+                    self.logger.write_log(self.client, 'Get Tenant Activities', 'DEBUG', 'Added %d activities to data. Total activities: %d', len(new_activities), total)
+
+            data = list(chain.from_iterable(pages))
+            self.logger.write_log(self.client, 'Get Tenant Activities', 'INFO', f'Completed fetching all activities for date: {date.date()}. Total activities: {len(data)}')
+            return data
 
         except requests.RequestException as e:
             self.logger.write_log(self.client, 'Get Tenant Activities', 'ERROR', f'Failed to get tenant activities: {str(e)}')
             raise
-
-
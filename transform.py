@@ -1,146 +1,296 @@
 from datetime import datetime 
 import concurrent.futures
+import logging
+import logging.handlers
+import queue
+from itertools import islice
+import numpy as np
 import pandas as pd 
+import pyarrow as pa
 
 today = datetime.now().strftime('%d%m%Y')
 
+# Access right keys the scanner API uses on users, per object type
+ACCESS_RIGHT_KEYS = (
+    "groupUserAccessRight",
+    "reportUserAccessRight",
+    "datasetUserAccessRight",
+    "dashboardUserAccessRight",
+    "dataflowUserAccessRight",
+    "datamartUserAccessRight"
+)
 
+# Clients transformed at the same time per service
+MAX_CLIENT_WORKERS = 16
 
+# Workspaces flattened at a time while the workspace content streams in
+WORKSPACE_BATCH_SIZE = 1000
 
+# Schemas of the fact tables that are written batch by batch
+WORKSPACE_CONTENT_SCHEMA = pa.schema([(column, pa.string()) for column in ["workspaceID", "objectID", "objectType"]])
+USER_ACCESS_SCHEMA = pa.schema([(column, pa.string()) for column in ["userID", "objectID", "accessType", "objectType"]])
 
-def fill_user_table(user_access, object_type, object_id, list_of_users):
-    for user in list_of_users:
-        access_right = user.get([x for x in user if 'UserAccessRight' in x][0])
-        user_access.append([user['graphId'], object_id, access_right, object_type])
 
 
-def fill_dimension_table(workspace_content, users, all_data, workspace_id, object_type, object_data):
-    try:
-        element_id = object_data['id']
-    except:
-        element_id = object_data['objectId']
-    fill_user_table(users, object_type, element_id, object_data.get('users', []))
 
-    dimension_data = {key:value for key,value in object_data.items() if type(value) == str}
-    try:
-        all_data[object_type].append(dimension_data)
-    except:
-        all_data[object_type] = [dimension_data]
 
-    workspace_content.append([workspace_id, element_id, object_type])
+def batched(items, size):
+    """Yield lists of up to `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def normalize_records(workspace_content_data, key):
+    """Flatten the `key` list of every workspace into one frame with the workspace id"""
+    workspaces = [workspace for workspace in workspace_content_data if workspace.get(key)]
+    if not workspaces:
+        return pd.DataFrame()
+    return pd.json_normalize(workspaces, record_path=[key], meta=['id'], meta_prefix='workspace_', max_level=0)
+
+
+def access_rights(users):
+    """Pick the *UserAccessRight value of each user row"""
+    keys = [key for key in ACCESS_RIGHT_KEYS if key in users]
+    rights = users[keys] if keys else users.filter(like='UserAccessRight')
+    if rights.empty:
+        return pd.Series(None, index=users.index, dtype=object)
+    return rights.bfill(axis=1).iloc[:, 0]
+
+
+def fill_user_table(user_access, object_type, object_ids, users):
+    user_access.append({
+        'userID': users['graphId'].to_numpy(dtype=object),
+        'objectID': np.asarray(object_ids, dtype=object),
+        'accessType': access_rights(users).to_numpy(dtype=object),
+        'objectType': np.full(len(users), object_type, dtype=object)
+    })
+
+
+def fill_dimension_table(workspace_content, user_access, all_data, object_type, objects):
+    element_ids = objects['id'] if 'id' in objects else objects['objectId']
+    if 'id' in objects and 'objectId' in objects:
+        element_ids = element_ids.fillna(objects['objectId'])
+
+    if 'users' in objects:
+        object_users = objects['users'].explode().dropna()
+        if not object_users.empty:
+            users = pd.json_normalize(object_users.tolist(), max_level=0)
+            fill_user_table(user_access, object_type, element_ids.loc[object_users.index].to_numpy(), users)
+
+    # Only the string fields of the objects are dimension data
+    dimension_columns = [
+        column for column in objects.columns
+        if column != 'workspace_id' and pd.api.types.infer_dtype(objects[column], skipna=True) == 'string'
+    ]
+    all_data[object_type] = pa.table({
+        column: pa.array(objects[column].to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+        for column in dimension_columns
+    })
+
+    workspace_content.append({
+        'workspaceID': objects['workspace_id'].to_numpy(dtype=object),
+        'objectID': element_ids.to_numpy(dtype=object),
+        'objectType': np.full(len(objects), object_type, dtype=object)
+    })
 
 
 def transformation(client_config, datalake_writer, sparkManager, secretManager):
-    """Process all clients per service type in parallel"""
+    """Process all clients per service type in parallel, the first failing client stops the run"""
+    # List the Key Vault secrets once for all clients, the listing pages through the whole vault
+    secret_names = [x.name for x in secretManager.list_properties_of_secrets()]
+
     for service, client_list in client_config.items():
-        print(f"Processing {service} data for clients: {client_list}")
+        if service != 'powerbi' or not client_list:
+            continue
+        datalake_writer.logger.write_log('system', service, 'INFO', f'Processing {service} data for clients: {client_list}')
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_CLIENT_WORKERS, len(client_list))) as executor:
             if service == 'powerbi':
                 futures = [
-                    executor.submit(process_single_client, client, datalake_writer, secretManager)
+                    executor.submit(process_single_client, client, datalake_writer, secretManager, secret_names)
                     for client in client_list
                 ]
             #elif service == 'azure':
                 # Alleen Azure subscription data verwerken voor Azure clients
             #    futures = [
-            #        executor.submit(process_azure_subscription_only, client, datalake_writer, secretManager)
+            #        executor.submit(process_azure_subscription_only, client, datalake_writer, secretManager, secret_names)
             #        for client in client_list
             #    ]
             # Je kunt hier meer services toevoegen indien nodig
             
-            concurrent.futures.wait(futures)
-
-def process_azure_subscription_only(client: str, datalake_writer, secret_manager) -> None:
+            done, pending = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+            for future in pending:
+                future.cancel()
+
+            # result() re-raises the exception of a failed client
+            for future in done:
+                future.result()
+
+def process_azure_subscriptions(client: str, azure_subs, datalake_writer, secret_manager) -> None:
+    """Process the Azure subscriptions of a client in parallel, they are independent"""
+    if not azure_subs:
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(azure_subs))) as executor:
+        list(executor.map(
+            lambda sub_name: process_azure_subscription(client, sub_name, datalake_writer, secret_manager),
+            azure_subs
+        ))
+
+def process_azure_subscription_only(client: str, datalake_writer, secret_manager, secret_names) -> None:
     """Process only Azure subscription data for a client"""
     try:
         # Process Azure subscriptions
-        azure_subs = [x.name for x in secret_manager.list_properties_of_secrets() 
-                     if client in x.name and "sub" in x.name]
+        azure_subs = [name for name in secret_names if client in name and "sub" in name]
 
-        for sub_name in azure_subs:
-            process_azure_subscription(client, sub_name, datalake_writer, secret_manager)
+        process_azure_subscriptions(client, azure_subs, datalake_writer, secret_manager)
     except Exception as e:
-        print(f"Error processing Azure data for client {client}: {str(e)}")
+        datalake_writer.logger.write_log(client, 'azure', 'ERROR', f'Error processing Azure data: {str(e)}')
         raise
 
-def process_single_client(client: str, datalake_writer, secret_manager) -> None:
+def columns_to_table(blocks, schema):
+    """Arrow table of blocks of column arrays, treating NaN as null"""
+    return pa.table({
+        name: pa.array(
+            np.concatenate([block[name] for block in blocks]) if blocks else np.array([], dtype=object),
+            type=schema.field(name).type,
+            from_pandas=True
+        )
+        for name in schema.names
+    }, schema=schema)
+
+
+def frame_to_table(frame):
+    """Arrow table of a flattened frame, typed so the tables of different batches can be concatenated"""
+    columns = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=object)
+        kind = pd.api.types.infer_dtype(frame[column], skipna=True)
+        # A column without values would be inferred as double in one batch and string in another
+        if kind == 'string':
+            columns[column] = pa.array(values, type=pa.string(), from_pandas=True)
+        elif kind == 'empty':
+            columns[column] = pa.nulls(len(frame))
+        else:
+            columns[column] = pa.array(values, from_pandas=True)
+    return pa.table(columns)
+
+
+def flatten_workspaces(workspace_content_data):
+    """Flatten a batch of workspaces into the users frame and the user access, workspace content and dimension tables"""
+    # Initialize collections
+    user_access = []
+    workspace_content = []
+    all_data = {}
+
+    # Process workspace content, one flattened frame per list key
+    df_users = normalize_records(workspace_content_data, 'users')
+    if not df_users.empty:
+        fill_user_table(user_access, 'workspace', df_users['workspace_id'].to_numpy(), df_users)
+        df_users = df_users.drop(columns=['workspace_id'])
+
+    object_keys = {
+        key for workspace in workspace_content_data
+        for key, value in workspace.items() if isinstance(value, list) and key != 'users'
+    }
+    for key in sorted(object_keys):
+        objects = normalize_records(workspace_content_data, key)
+        if not objects.empty:
+            fill_dimension_table(workspace_content, user_access, all_data, key, objects)
+
+    # Convert the column blocks straight to arrow
+    return df_users, columns_to_table(user_access, USER_ACCESS_SCHEMA), \
+        columns_to_table(workspace_content, WORKSPACE_CONTENT_SCHEMA), all_data
+
+
+def concat_batches(tables):
+    """Concatenate the arrow tables of all batches, their columns may differ"""
+    return pa.concat_tables(tables, promote_options='permissive') if tables else pa.table({})
+
+
+def process_single_client(client: str, datalake_writer, secret_manager, secret_names) -> None:
     """Process data for a single client"""
     try:
         # Read data
-        workspace_data = pd.DataFrame(datalake_writer.read_json_data('test-app', f'{client}_workspaces_{today}'))
-        activities_data = pd.DataFrame(datalake_writer.read_json_data('test-app', f'{client}_activities_{today}'))
-        workspace_content_data = datalake_writer.read_json_data('test-app', f'{client}_workspace_content_{today}')
+        workspace_data = datalake_writer.read_parquet_data('test-app', f'workspaces_{today}', filters=[('client', '=', client)])
+        activities_data = datalake_writer.read_arrow_json('test-app', f'{client}_activities_{today}')
+        workspace_content_data = datalake_writer.iter_json_items('test-app', f'{client}_workspace_content_{today}')
 
-        # Initialize collections
-        user_access = []
         users = []
-        workspace_content = []
-        all_data = {}
-
-        # Process workspace content
-        for workspace in workspace_content_data:
-            for key, value in workspace.items():
-                if isinstance(value, list):
-                    if key == "users":
-                        fill_user_table(user_access, 'workspace', workspace['id'], value)
-                        users.extend(value)
-                    else:
-                        for object_ in value:
-                            fill_dimension_table(workspace_content, user_access, all_data, 
-                                              workspace['id'], key, object_)
-
-        # Convert to DataFrames
-        df_workspace_content = pd.DataFrame(workspace_content, 
-                                          columns=["workspaceID", "objectID", "objectType"])
-        df_user_access = pd.DataFrame(user_access, 
-                                    columns=["userID", "objectID", "accessType"])
-        df_users = pd.DataFrame(users)
-
-        # Create dimension dataframes
-        df_object_dimension_data = {
-            key: pd.DataFrame(value) 
-            for key, value in all_data.items() 
-            if key in ["reports", "datasets"]
-        }
+        dimensions = {}
 
-        # Write to silver layer
-        datalake_writer.write_parquet_data(
-            df_workspace_content,
-            'silver',
-            f'{client}_workspace_content'
-        )
+        # Flatten the workspaces in batches while they stream in, the fact tables are encoded per batch
+        with datalake_writer.parquet_writer(WORKSPACE_CONTENT_SCHEMA, 'silver', f'{client}_workspace_content') as workspace_content_writer, \
+                datalake_writer.parquet_writer(USER_ACCESS_SCHEMA, 'silver', f'{client}_user_access') as user_access_writer:
+            for batch in batched(workspace_content_data, WORKSPACE_BATCH_SIZE):
+                df_users, user_access, workspace_content, all_data = flatten_workspaces(batch)
+
+                workspace_content_writer.write_table(workspace_content)
+                user_access_writer.write_table(user_access)
 
-        for object_key, dataframe in df_object_dimension_data.items():
-            datalake_writer.write_parquet_data(
-                dataframe,
+                # Dimensions gain columns from batch to batch, so they are combined at the end
+                if not df_users.empty:
+                    users.append(frame_to_table(df_users))
+                for key in ["reports", "datasets"]:
+                    if key in all_data:
+                        dimensions.setdefault(key, []).append(all_data[key])
+
+        # Write to silver layer
+        for object_key, tables in dimensions.items():
+            datalake_writer.write_arrow_table(
+                concat_batches(tables),
                 'silver', 
                 f'{client}_{object_key}'
             )
 
-        datalake_writer.write_parquet_data(
-            df_users,
+        datalake_writer.write_arrow_table(
+            concat_batches(users),
             'silver',
             f'{client}_users'
         )
 
-        datalake_writer.write_parquet_data(
-            df_user_access,
-            'silver',
-            f'{client}_user_access'
-        )
-
         # Process Azure subscriptions
-        azure_subs = [x.name for x in secret_manager.list_properties_of_secrets() 
-                     if client in x.name and "sub" in x.name]
+        azure_subs = [name for name in secret_names if client in name and "sub" in name]
 
-        for sub_name in azure_subs:
-            process_azure_subscription(client, sub_name, datalake_writer, secret_manager)
+        process_azure_subscriptions(client, azure_subs, datalake_writer, secret_manager)
 
     except Exception as e:
-        print(f"Error processing client {client}: {str(e)}")
+        datalake_writer.logger.write_log(client, 'powerbi', 'ERROR', f'Error processing client: {str(e)}')
         raise
 
+def spend_table(costs) -> pa.Table:
+    """Arrow table of the rows of a cost query result, named after its columns"""
+    properties = costs['properties']
+    rows = properties['rows']
+    names = [column['name'] for column in properties.get('columns', [])] or \
+        [str(position) for position in range(len(rows[0]) if rows else 0)]
+    columns = list(zip(*rows)) if rows else [[] for _ in names]
+    return pa.table([pa.array(column) for column in columns], names=names)
+
+
+def read_seed_spend(client: str, fileName: str, datalake_writer):
+    """Read the spend collected before the spend dataset existed, None when there is none"""
+    legacy_name = f"{client}_{fileName}_spend"
+    historical_name = f'{client}_azure_{fileName}_historical'
+
+    if datalake_writer.exists('silver', legacy_name):
+        # The JSON spend was written with the column positions as keys, renamed once the new rows are known
+        return pa.Table.from_pylist(datalake_writer.read_json_data('silver', legacy_name))
+
+    if datalake_writer.exists('bronze', historical_name):
+        return spend_table(datalake_writer.read_json_data('bronze', historical_name))
+
+    return None
+
+
+def read_daily_spend(client: str, fileName: str, datalake_writer):
+    """Read yesterday's spend, None when it was not collected"""
+    daily_name = f'{client}_azure_{fileName}_{today}'
+    if not datalake_writer.exists('bronze', daily_name):
+        return None
+    return spend_table(datalake_writer.read_json_data('bronze', daily_name))
+
+
 def process_azure_subscription(client: str, sub_name: str, 
                              datalake_writer, secret_manager) -> None:
     """Process Azure subscription data for a client"""
@@ -148,52 +298,42 @@ def process_azure_subscription(client: str, sub_name: str,
         sub = secret_manager.get_secret(sub_name).value
         fileName = sub.split('-')[-1]
 
-        try:
-            # Try to read existing data
-            historical_data = pd.DataFrame(
-                datalake_writer.read_json_data('silver', f"{client}_{fileName}_spend")
-            )
-        except:
-            # If no existing data, read from historical
-            try:
-                historical_data = datalake_writer.read_json_data(
-                    'bronze', 
-                    f'{client}_azure_{fileName}_historical'
-                )
-                h_data = historical_data['properties']['rows']
-                historical_data = pd.DataFrame(h_data)
-                
-                datalake_writer.write_json_data(
-                    historical_data.to_dict(orient='records'),
-                    'silver',
-                    f"{client}_{fileName}_spend"
-                )
-            except:
-                historical_data = pd.DataFrame()
-
-        # Process today's data
-        try:
-            yesterdays_data = datalake_writer.read_json_data(
-                'bronze', 
-                f'{client}_azure_{fileName}_{today}'
-            )
-            y_data = yesterdays_data['properties']['rows']
-            df = pd.DataFrame(y_data)
-
-            # Append new data
-            if not historical_data.empty:
-                df = pd.concat([historical_data, df], ignore_index=True)
-
-            datalake_writer.write_json_data(
-                df.to_dict(orient='records'),
-                'silver',
-                f"{client}_{fileName}_spend"
-            )
-        except Exception as e:
-            print(f"Error processing yesterday's data for {client}/{fileName}: {str(e)}")
+        # The spend is a parquet dataset with a part per run, so only new rows are written
+        spend_path = f"spend/{client}_{fileName}"
+
+        # List the dataset and read yesterday's data at the same time
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            parts_future = executor.submit(datalake_writer.list_parquet_parts, 'silver', spend_path)
+            daily_future = executor.submit(read_daily_spend, client, fileName, datalake_writer)
+
+        daily_data = daily_future.result()
+
+        # The seed is named after the daily columns, so without yesterday's data it waits for the next run
+        if daily_data is None:
+            datalake_writer.logger.write_log(client, 'azure', 'WARNING', f'No data of yesterday for subscription {fileName}')
+            return
+
+        # Start a new dataset from the spend collected so far
+        if not parts_future.result():
+            seed_data = read_seed_spend(client, fileName, datalake_writer)
+            if seed_data is not None and seed_data.num_rows:
+                if seed_data.num_columns == daily_data.num_columns:
+                    datalake_writer.append_arrow_table(
+                        seed_data.rename_columns(daily_data.column_names), 'silver', spend_path
+                    )
+                else:
+                    datalake_writer.logger.write_log(
+                        client, 'azure', 'WARNING',
+                        f'Spend collected so far for subscription {fileName} has {seed_data.num_columns} columns '
+                        f'instead of {daily_data.num_columns}, it is not added'
+                    )
+
+        # Append only the new data
+        datalake_writer.append_arrow_table(daily_data, 'silver', spend_path)
 
     except Exception as e:
-        print(f"Error processing subscription {sub_name}: {str(e)}")
+        datalake_writer.logger.write_log(client, 'azure', 'ERROR', f'Error processing subscription {sub_name}: {str(e)}')
+        raise
 
 
 
@@ -203,8 +343,17 @@ from functions.clients import initialize_clients
 
 # Main execution
 if __name__ == "__main__":
-    secret, writer, logger = get_credentials()
-    client_config = initialize_clients()
-    
-    spark = None
-    transformation(client_config, writer, spark, secret)
+    # Worker threads only enqueue their log records, a single listener thread writes them
+    log_queue = queue.SimpleQueue()
+    logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+
+    try:
+        secret, writer, logger = get_credentials()
+        client_config = initialize_clients()
+        
+        spark = None
+        transformation(client_config, writer, spark, secret)
+    finally:
+        listener.stop()